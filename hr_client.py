@@ -1,240 +1,925 @@
 import nest_asyncio
 import asyncio
+import argparse
 from llama_index.tools.mcp import BasicMCPClient, McpToolSpec
-from llama_index.core.agent.workflow import FunctionAgent, ToolCallResult, ToolCall
+from llama_index.core.agent.workflow import AgentStream, FunctionAgent, ToolCallResult, ToolCall
 from llama_index.core.workflow import Context
 from llama_index.llms.ollama import Ollama
 from llama_index.core import Settings
+from llama_index.core.llms import ChatMessage
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.tools import AsyncBaseTool, ToolMetadata, ToolOutput
+from llama_index.core.bridge.pydantic import PrivateAttr
 import json
+import hashlib
+import os
+import re
+import sys
+import textwrap
+import time
+import weakref
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
-# Configure LLM
-llm = Ollama(model="llama3.2", request_timeout=120.0)
+import numpy as np
+
+try:
+    import ahocorasick  # optional: pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import numba  # optional: compiled batch classification
+except ImportError:
+    numba = None
+
+try:
+    import diskcache  # optional: tool results survive restarts
+except ImportError:
+    diskcache = None
+
+try:
+    import faiss  # optional: faiss-cpu, vector search for the semantic cache
+except ImportError:
+    faiss = None
+
+try:
+    import orjson  # optional: faster JSON encoding for verbose output
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # optional: faster event loop for the CLI
+except ImportError:
+    uvloop = None
+
+def in_ipython() -> bool:
+    """Return True when running inside an IPython shell or Jupyter kernel."""
+    try:
+        from IPython import get_ipython
+    except ImportError:
+        return False
+    return get_ipython() is not None
+
+# Seconds an Ollama endpoint is skipped after a failed request
+OLLAMA_QUARANTINE_SECONDS = 30.0
+
+class PooledOllama(Ollama):
+    """
+    Ollama LLM that spreads async chat requests over several Ollama servers.
+    
+    Requests go to the endpoints in round-robin order, each endpoint serving at
+    most max_inflight_per_endpoint generations at a time. An endpoint that
+    errors is quarantined for OLLAMA_QUARANTINE_SECONDS and the request is
+    retried on the next one; streams only fail over before their first chunk.
+    Synchronous calls go to the first endpoint.
+    """
+    
+    _endpoints: List[Ollama] = PrivateAttr()
+    _max_inflight: int = PrivateAttr()
+    _semaphores: Optional[List[asyncio.Semaphore]] = PrivateAttr(default=None)
+    _quarantined_until: List[float] = PrivateAttr()
+    _next_endpoint: int = PrivateAttr(default=0)
+    
+    def __init__(self, base_urls: List[str], model: str, max_inflight_per_endpoint: int = 1, **kwargs: Any):
+        super().__init__(model=model, base_url=base_urls[0], **kwargs)
+        self._endpoints = [Ollama(model=model, base_url=url, **kwargs) for url in base_urls]
+        self._max_inflight = max_inflight_per_endpoint
+        self._quarantined_until = [0.0] * len(base_urls)
+    
+    def _endpoint_order(self) -> List[int]:
+        """Endpoint indices to try, healthy ones first, advancing the round-robin."""
+        count = len(self._endpoints)
+        start = self._next_endpoint
+        self._next_endpoint = (start + 1) % count
+        order = [(start + k) % count for k in range(count)]
+        now = time.monotonic()
+        healthy = [i for i in order if self._quarantined_until[i] <= now]
+        return healthy or order
+    
+    def _semaphore(self, index: int) -> asyncio.Semaphore:
+        # Created on first use so they belong to the running event loop
+        if self._semaphores is None:
+            self._semaphores = [asyncio.Semaphore(self._max_inflight) for _ in self._endpoints]
+        return self._semaphores[index]
+    
+    def _quarantine(self, index: int, error: Exception):
+        self._quarantined_until[index] = time.monotonic() + OLLAMA_QUARANTINE_SECONDS
+        print(f"⚠️ Ollama at {self._endpoints[index].base_url} failed ({error}); skipping it for {OLLAMA_QUARANTINE_SECONDS:.0f}s")
+    
+    def get_context_window(self) -> int:
+        # Ask each endpoint in turn so one unreachable server does not break metadata
+        if self.context_window == -1:
+            for endpoint in self._endpoints:
+                try:
+                    self.context_window = endpoint.get_context_window()
+                    break
+                except Exception:
+                    continue
+        return super().get_context_window()
+    
+    async def achat(self, messages, **kwargs: Any):
+        last_error = None
+        for index in self._endpoint_order():
+            async with self._semaphore(index):
+                try:
+                    return await self._endpoints[index].achat(messages, **kwargs)
+                except Exception as e:
+                    self._quarantine(index, e)
+                    last_error = e
+        raise last_error
+    
+    async def astream_chat(self, messages, **kwargs: Any):
+        async def gen():
+            last_error = None
+            for index in self._endpoint_order():
+                async with self._semaphore(index):
+                    try:
+                        stream = await self._endpoints[index].astream_chat(messages, **kwargs)
+                        first = await stream.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    except Exception as e:
+                        self._quarantine(index, e)
+                        last_error = e
+                        continue
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                    return
+            raise last_error
+        
+        return gen()
+
+# Configure LLM; OLLAMA_URLS is a comma-separated list of Ollama servers to share the load
+OLLAMA_URLS = [url.strip() for url in os.environ.get("OLLAMA_URLS", "").split(",") if url.strip()]
+if len(OLLAMA_URLS) > 1:
+    llm = PooledOllama(OLLAMA_URLS, model="llama3.2", request_timeout=120.0)
+elif OLLAMA_URLS:
+    llm = Ollama(model="llama3.2", base_url=OLLAMA_URLS[0], request_timeout=120.0)
+else:
+    llm = Ollama(model="llama3.2", request_timeout=120.0)
 Settings.llm = llm
 
-# System prompt for the HR assistant
-SYSTEM_PROMPT = """\
-You are an AI-powered HR Assistant for managing human resources operations.
-
-You have access to comprehensive HR management tools that allow you to:
-- Manage employee records (add, update, search, terminate)
-- Handle organizational structure and departments
-- Process leave requests and manage leave balances
-- Update salaries and generate compensation reports
-- Track performance reviews
-- Generate analytics and dashboards
-
-KEY TOOLS YOU SHOULD USE (USE THESE SIMPLIFIED TOOLS THAT ACCEPT NAMES):
-- add_employee: Add new employees
-  REQUIRED: first_name, last_name, email, department, position
-  OPTIONAL: salary, phone, hire_date
-- check_employee_leave_balance: Check leave balance by employee NAME (e.g., "John Doe")
-- update_employee_salary: Update salary by employee NAME
-- submit_leave_request: Submit leave request by employee NAME
-- list_all_employees: Get a list of all active employees
-- find_employees_by_department: Search employees by department
-- generate_hr_dashboard: Get comprehensive HR metrics
-
-IMPORTANT: For common operations, use the simplified tools above that accept employee names directly.
-Only use these tools if you need employee IDs:
-- get_leave_balance: Requires employee_id (e.g., "EMP00001")
-- request_leave: Requires employee_id
-- update_salary: Requires employee_id
-
-CRITICAL RULES:
-1. ALWAYS use the simplified tools (check_employee_leave_balance, update_employee_salary, submit_leave_request) when users provide employee names
-2. NEVER call add_employee without ALL required fields (especially email)
-3. If user doesn't provide email when adding an employee, ASK for it FIRST before calling any tool
-4. If a tool returns an error about missing fields, inform the user clearly that the action FAILED
-5. When users say "Check Sarah Johnson's leave balance", use check_employee_leave_balance("Sarah Johnson")
-6. DO NOT try to pass employee names to tools that require employee_id
-
-When interacting with users:
-1. For adding employees, ALWAYS ensure you have: first_name, last_name, email, department, position
-2. Always confirm sensitive operations before executing (like terminations or salary changes)
-3. Provide clear, professional responses
-4. When searching for employees, show relevant details
-5. For reports, summarize key findings
-6. If an operation fails, explicitly state it failed and why
-
-Remember to maintain confidentiality and professionalism when handling employee data.
-"""
+# System prompt for the HR assistant. Kept terse because it is re-sent every turn;
+# tool signatures reach the model separately through the tool schemas.
+SYSTEM_PROMPT = textwrap.dedent("""\
+    You are an HR assistant with tools for employees, departments, leave, salaries, performance reviews and analytics.
+
+    When the user names an employee, use the name-based tools:
+    - add_employee (needs first_name, last_name, email, department, position)
+    - check_employee_leave_balance, update_employee_salary, submit_leave_request
+    - list_all_employees, find_employees_by_department, generate_hr_dashboard
+    get_leave_balance, request_leave and update_salary need an employee_id such as EMP00001, never a name.
+
+    Rules:
+    1. Never call add_employee without an email; ask for it first.
+    2. Confirm terminations and salary changes before running them.
+    3. If a tool returns an error, say clearly that the action FAILED and why.
+    4. Be concise and professional, summarize reports, and keep employee data confidential.
+    """)
+
+# Warn at startup when the system prompt grows past this many tokens
+SYSTEM_PROMPT_TOKEN_BUDGET = 220
+
+# Example exchange sent as history on the first turn of each conversation context
+FEW_SHOT_MESSAGES = [
+    ChatMessage(role="user", content="Add Sarah Johnson to Engineering as Senior Developer"),
+    ChatMessage(
+        role="assistant",
+        content="I need Sarah Johnson's email address before I can add her. What is it?",
+    ),
+]
 
 # Context understanding prompts for different HR scenarios
 CONTEXT_PROMPTS = {
-    "employee_query": """
-    The user is asking about employee information. Extract:
-    - Employee name or ID if mentioned
-    - What information they need (contact, position, department, etc.)
-    - Whether they want to search or get specific details
-    
-    CRITICAL for add_employee: Ensure email is provided. If missing, ask for it first!
-    """,
-    
-    "leave_request": """
-    The user is dealing with leave management. Identify:
-    - Who is requesting leave (employee name/ID)
-    - Type of leave (annual, sick, personal, etc.)
-    - Date range
-    - Whether this is a new request, approval, or balance check
-    """,
-    
-    "salary_compensation": """
-    The user is asking about salary/compensation. Determine:
-    - Specific employee or department-wide analysis
-    - Whether they want to update salary or generate reports
-    - Any filters or criteria mentioned
-    """,
-    
-    "organizational": """
-    The user is asking about organizational structure. Identify:
-    - Department names mentioned
-    - Whether they want org chart, department info, or transfers
-    - Scope (entire company or specific department)
-    """,
-    
-    "analytics": """
-    The user wants reports or analytics. Determine:
-    - Type of report (dashboard, turnover, diversity, etc.)
-    - Time period
-    - Specific departments or filters
+    "employee_query": "Employee question: note the employee name or ID and what they want. "
+                      "Adding an employee requires an email; ask for it if missing.",
+    "leave_request": "Leave question: note the employee, leave type, dates, and whether it is a "
+                     "new request, an approval or a balance check.",
+    "salary_compensation": "Compensation question: note the employee or department, whether to "
+                           "update a salary or report, and any filters.",
+    "organizational": "Organization question: note departments mentioned and whether they want "
+                      "an org chart, department info or a transfer.",
+    "analytics": "Analytics request: note the report type, time period and any department filters.",
+}
+
+# Context prompts joined with the user-query header once, so every turn reuses
+# byte-identical prefixes and Ollama's prompt cache can match them
+_CONTEXT_PREFIX: Dict[str, str] = {
+    context: f"{prompt}\n\nUser query: " for context, prompt in CONTEXT_PROMPTS.items()
+}
+
+def print_prompt_token_counts():
     """
+    Print approximate token sizes of the fixed prompt prefixes.
+
+    Uses LlamaIndex's default tokenizer, which approximates llama3.2's, to help
+    size Ollama's num_ctx. Skipped quietly if the tokenizer is unavailable.
+    """
+    try:
+        tokenize = Settings.tokenizer
+        system_tokens = len(tokenize(SYSTEM_PROMPT))
+        context_tokens = {context: len(tokenize(prefix)) for context, prefix in _CONTEXT_PREFIX.items()}
+    except Exception:
+        return
+    print(f"📏 Prompt prefix: system ~{system_tokens} tokens, "
+          f"context ~{min(context_tokens.values())}-{max(context_tokens.values())} tokens\n")
+    if system_tokens > SYSTEM_PROMPT_TOKEN_BUDGET:
+        print(f"⚠️ System prompt exceeds its budget of {SYSTEM_PROMPT_TOKEN_BUDGET} tokens\n")
+
+# Seconds a read-only tool's result stays fresh in the client-side cache.
+# Tools not listed here always go to the MCP server.
+TOOL_CACHE_TTLS = {
+    "generate_hr_dashboard": 60,
+    "list_all_employees": 30,
+    "find_employees_by_department": 30,
+    "check_employee_leave_balance": 300,
 }
 
+# Tools that change HR data; running one invalidates cached results
+MUTATING_TOOLS = frozenset({
+    "add_employee",
+    "update_employee_salary",
+    "submit_leave_request",
+    "manage_employee",
+    "manage_department",
+    "request_leave",
+    "approve_leave",
+    "update_salary",
+    "create_performance_review",
+})
+
+# cache key -> (expires_at, employee tag, tool output)
+_TOOL_CACHE: Dict[str, Tuple[float, Optional[str], ToolOutput]] = {}
+
+# cache key -> future of the identical read-only call currently running
+_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+# On-disk tier behind _TOOL_CACHE, opened by open_disk_cache() when diskcache is installed
+TOOL_CACHE_DIR = os.path.expanduser("~/.cache/hr_client")
+_DISK_CACHE = None
+
+# Disk cache tag of results that span many employees (dashboard, listings)
+_AGGREGATE_TAG = "*"
+
+def _cache_key(tool_name: str, tool_kwargs: Dict[str, Any]) -> str:
+    """Stable hash of a tool invocation."""
+    payload = json.dumps({"tool": tool_name, "kwargs": tool_kwargs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def open_disk_cache():
+    """Open the on-disk result cache, drop expired entries and preload the rest."""
+    global _DISK_CACHE
+    if diskcache is None:
+        return
+    try:
+        _DISK_CACHE = diskcache.Cache(TOOL_CACHE_DIR)
+        _DISK_CACHE.create_tag_index()
+        _DISK_CACHE.expire()
+        now_wall, now = time.time(), time.monotonic()
+        for key in list(_DISK_CACHE):
+            record = _DISK_CACHE.get(key)
+            if record:
+                expires_at = now + record["ts"] + record["ttl"] - now_wall
+                _TOOL_CACHE[key] = (expires_at, record["employee"], record["result"])
+    except Exception as e:
+        print(f"⚠️ Persistent tool cache unavailable: {str(e)}")
+        _DISK_CACHE = None
+
+def _load_disk_entry(key: str) -> Optional[ToolOutput]:
+    """Promote a result another run stored on disk into the memory tier."""
+    try:
+        record = _DISK_CACHE.get(key)
+    except Exception:
+        return None
+    if not record:
+        return None
+    expires_at = time.monotonic() + record["ts"] + record["ttl"] - time.time()
+    _TOOL_CACHE[key] = (expires_at, record["employee"], record["result"])
+    return record["result"]
+
+def _store_result(key: str, ttl: float, employee: Optional[str], output: ToolOutput):
+    _TOOL_CACHE[key] = (time.monotonic() + ttl, employee, output)
+    if _DISK_CACHE is not None:
+        record = {"hash": key, "result": output, "ts": time.time(), "ttl": ttl, "employee": employee}
+        try:
+            _DISK_CACHE.set(key, record, expire=ttl, tag=employee or _AGGREGATE_TAG)
+        except Exception:
+            pass  # the memory tier still has it
+
+def _employee_tag(tool_kwargs: Dict[str, Any]) -> Optional[str]:
+    """Normalized name of the employee a name-based tool call refers to, if any."""
+    name = tool_kwargs.get('employee_name')
+    if not name and tool_kwargs.get('first_name') and tool_kwargs.get('last_name'):
+        name = f"{tool_kwargs['first_name']} {tool_kwargs['last_name']}"
+    return ' '.join(str(name).lower().split()) if name else None
+
+def invalidate_tool_cache(employee: Optional[str] = None):
+    """
+    Drop cached tool results.
+
+    With an employee tag only that employee's entries and aggregate views
+    (dashboard, listings) are dropped; without one the whole cache is cleared.
+    Semantically cached answers are always dropped.
+    """
+    if semantic_cache is not None:
+        semantic_cache.clear()
+    if employee is None:
+        _TOOL_CACHE.clear()
+        if _DISK_CACHE is not None:
+            _DISK_CACHE.clear()
+        return
+    for key, (_, tag, _) in list(_TOOL_CACHE.items()):
+        if tag is None or tag == employee:
+            del _TOOL_CACHE[key]
+    if _DISK_CACHE is not None:
+        _DISK_CACHE.evict(employee)
+        _DISK_CACHE.evict(_AGGREGATE_TAG)
+
+class CachedTool(AsyncBaseTool):
+    """
+    Wrap an MCP tool so repeated read-only calls are served from memory (or
+    from the on-disk cache across restarts) and concurrent identical read-only
+    calls collapse into a single MCP request.
+    """
+
+    def __init__(self, tool: AsyncBaseTool):
+        self._tool = tool
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._tool.metadata
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        output = self._tool.call(*args, **kwargs)
+        self._after_call(kwargs)
+        return output
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        name = self.metadata.name
+        ttl = TOOL_CACHE_TTLS.get(name, 0)
+        if ttl <= 0:
+            output = await self._tool.acall(*args, **kwargs)
+            self._after_call(kwargs)
+            return output
+
+        key = _cache_key(name, kwargs)
+        cached = _TOOL_CACHE.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[2]
+        if cached is None and _DISK_CACHE is not None:
+            output = _load_disk_entry(key)
+            if output is not None:
+                return output
+
+        # Concurrent identical calls share the one already in flight
+        while key in _INFLIGHT:
+            inflight = _INFLIGHT[key]
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The caller that owned the request was cancelled; retry it here
+
+        inflight = asyncio.get_running_loop().create_future()
+        _INFLIGHT[key] = inflight
+        try:
+            output = await self._tool.acall(*args, **kwargs)
+        except BaseException as e:
+            del _INFLIGHT[key]
+            if isinstance(e, asyncio.CancelledError):
+                inflight.cancel()
+            else:
+                inflight.set_exception(e)
+                inflight.exception()  # nobody may be waiting; don't log it as unretrieved
+            raise
+        del _INFLIGHT[key]
+
+        if not output.is_error:
+            _store_result(key, ttl, _employee_tag(kwargs), output)
+        inflight.set_result(output)
+        return output
+
+    def _after_call(self, tool_kwargs: Dict[str, Any]):
+        if self.metadata.name in MUTATING_TOOLS:
+            invalidate_tool_cache(_employee_tag(tool_kwargs))
+
+# Trigger phrases of each keyword group, matched as substrings of the lowercased query
+_ADD_EMP_KW = frozenset(('add employee', 'new employee', 'hire', 'onboard'))
+_SEARCH_KW = frozenset(('find', 'search', 'list employees', 'who works'))
+_TERMINATE_KW = frozenset(('terminate', 'fire', 'end employment'))
+_LEAVE_KW = frozenset(('leave request', 'vacation', 'time off', 'pto'))
+_APPROVE_KW = frozenset(('approve',))
+_BALANCE_KW = frozenset(('balance', 'remaining'))
+_SALARY_KW = frozenset(('salary', 'pay', 'compensation', 'raise'))
+_CHANGE_KW = frozenset(('update', 'change', 'increase'))
+_ORG_KW = frozenset(('org chart', 'organization', 'hierarchy', 'reports to'))
+_DEPARTMENT_KW = frozenset(('department', 'transfer'))
+_ANALYTICS_KW = frozenset(('dashboard', 'metrics', 'report', 'analytics'))
+_TURNOVER_KW = frozenset(('turnover',))
+_PERFORMANCE_KW = frozenset(('performance', 'review', 'evaluation'))
+
+# Trigger phrase -> keyword group
+_INTENT_KEYWORDS = {
+    phrase: group
+    for group, phrases in (
+        ('add_employee', _ADD_EMP_KW),
+        ('search', _SEARCH_KW),
+        ('terminate', _TERMINATE_KW),
+        ('leave', _LEAVE_KW),
+        ('approve', _APPROVE_KW),
+        ('balance', _BALANCE_KW),
+        ('salary', _SALARY_KW),
+        ('change', _CHANGE_KW),
+        ('org', _ORG_KW),
+        ('department', _DEPARTMENT_KW),
+        ('analytics', _ANALYTICS_KW),
+        ('turnover', _TURNOVER_KW),
+        ('performance', _PERFORMANCE_KW),
+    )
+    for phrase in sorted(phrases)
+}
+
+# Intent resolution in priority order: the first rule whose groups all matched wins
+_INTENT_RULES = [
+    (frozenset({'add_employee'}), {"intent": "add_employee", "context": "employee_query"}),
+    (frozenset({'search'}), {"intent": "search_employees", "context": "employee_query"}),
+    (frozenset({'terminate'}), {"intent": "terminate_employee", "context": "employee_query"}),
+    (frozenset({'leave', 'approve'}), {"intent": "approve_leave", "context": "leave_request"}),
+    (frozenset({'leave', 'balance'}), {"intent": "check_leave_balance", "context": "leave_request"}),
+    (frozenset({'leave'}), {"intent": "request_leave", "context": "leave_request"}),
+    (frozenset({'salary', 'change'}), {"intent": "update_salary", "context": "salary_compensation"}),
+    (frozenset({'salary'}), {"intent": "compensation_report", "context": "salary_compensation"}),
+    (frozenset({'org'}), {"intent": "org_chart", "context": "organizational"}),
+    (frozenset({'department'}), {"intent": "department_management", "context": "organizational"}),
+    (frozenset({'analytics', 'turnover'}), {"intent": "turnover_analysis", "context": "analytics"}),
+    (frozenset({'analytics'}), {"intent": "hr_dashboard", "context": "analytics"}),
+    (frozenset({'performance'}), {"intent": "performance_review", "context": "employee_query"}),
+]
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w.-]+')
+
+if ahocorasick is not None:
+    _KEYWORD_AC = ahocorasick.Automaton()
+    for _phrase, _group in _INTENT_KEYWORDS.items():
+        _KEYWORD_AC.add_word(_phrase, _group)
+    _KEYWORD_AC.make_automaton()
+else:
+    # Zero-width lookahead so overlapping phrases are all seen in one scan.
+    # Longest phrases are tried first, so a shorter phrase starting at the same
+    # position is only reachable through the containment table below.
+    _KEYWORD_RE = re.compile('(?=(%s))' % '|'.join(
+        re.escape(phrase) for phrase in sorted(_INTENT_KEYWORDS, key=len, reverse=True)
+    ))
+    _PHRASE_GROUPS = {
+        phrase: frozenset(group for other, group in _INTENT_KEYWORDS.items() if other in phrase)
+        for phrase in _INTENT_KEYWORDS
+    }
+
+def _match_keyword_groups(query_lower: str) -> set:
+    """Return every keyword group triggered by the query in a single pass."""
+    if ahocorasick is not None:
+        return {group for _, group in _KEYWORD_AC.iter(query_lower)}
+    matched = set()
+    for match in _KEYWORD_RE.finditer(query_lower):
+        matched |= _PHRASE_GROUPS[match.group(1)]
+    return matched
+
 def interpret_query(query: str) -> Dict[str, Any]:
     """
     Interpret natural language query to determine intent and parameters.
     """
-    query_lower = query.lower()
-    
-    # Employee management keywords
-    if any(word in query_lower for word in ['add employee', 'new employee', 'hire', 'onboard']):
-        # Check if email is mentioned
-        has_email = '@' in query or '.com' in query_lower
-        return {
-            "intent": "add_employee", 
-            "context": "employee_query",
-            "has_email": has_email,
-            "warning": None if has_email else "Email is required for adding employees"
-        }
-    elif any(word in query_lower for word in ['find', 'search', 'list employees', 'who works']):
-        return {"intent": "search_employees", "context": "employee_query"}
-    elif any(word in query_lower for word in ['terminate', 'fire', 'end employment']):
-        return {"intent": "terminate_employee", "context": "employee_query"}
-    
-    # Leave management keywords
-    elif any(word in query_lower for word in ['leave request', 'vacation', 'time off', 'pto']):
-        if 'approve' in query_lower:
-            return {"intent": "approve_leave", "context": "leave_request"}
-        elif 'balance' in query_lower or 'remaining' in query_lower:
-            return {"intent": "check_leave_balance", "context": "leave_request"}
-        else:
-            return {"intent": "request_leave", "context": "leave_request"}
+    matched = _match_keyword_groups(query.lower())
     
-    # Salary/compensation keywords
-    elif any(word in query_lower for word in ['salary', 'pay', 'compensation', 'raise']):
-        if 'update' in query_lower or 'change' in query_lower or 'increase' in query_lower:
-            return {"intent": "update_salary", "context": "salary_compensation"}
-        else:
-            return {"intent": "compensation_report", "context": "salary_compensation"}
-    
-    # Organizational keywords
-    elif any(word in query_lower for word in ['org chart', 'organization', 'hierarchy', 'reports to']):
-        return {"intent": "org_chart", "context": "organizational"}
-    elif any(word in query_lower for word in ['department', 'transfer']):
-        return {"intent": "department_management", "context": "organizational"}
-    
-    # Analytics keywords
-    elif any(word in query_lower for word in ['dashboard', 'metrics', 'report', 'analytics']):
-        if 'turnover' in query_lower:
-            return {"intent": "turnover_analysis", "context": "analytics"}
-        else:
-            return {"intent": "hr_dashboard", "context": "analytics"}
-    
-    # Performance management
-    elif any(word in query_lower for word in ['performance', 'review', 'evaluation']):
-        return {"intent": "performance_review", "context": "employee_query"}
+    for required, result in _INTENT_RULES:
+        if required <= matched:
+            result = dict(result)
+            if result['intent'] == 'add_employee':
+                # Check if email is mentioned
+                has_email = _EMAIL_RE.search(query) is not None
+                result['has_email'] = has_email
+                result['warning'] = None if has_email else "Email is required for adding employees"
+            return result
     
     # Default
     return {"intent": "general_query", "context": "employee_query"}
 
+# Intent codes returned by interpret_query_batch, indexed by code
+INTENT_NAMES = tuple(result['intent'] for _, result in _INTENT_RULES) + ('general_query',)
+
+# Keyword table flattened into arrays for the compiled batch classifier
+_GROUP_BITS = {group: 1 << i for i, group in enumerate(sorted(set(_INTENT_KEYWORDS.values())))}
+_NEEDLE_BYTES = [phrase.encode('utf-8') for phrase in _INTENT_KEYWORDS]
+_NEEDLES = np.frombuffer(b''.join(_NEEDLE_BYTES), dtype=np.uint8)
+_NEEDLE_OFFSETS = np.cumsum([0] + [len(b) for b in _NEEDLE_BYTES], dtype=np.int64)
+_NEEDLE_BITS = np.array([_GROUP_BITS[group] for group in _INTENT_KEYWORDS.values()], dtype=np.int64)
+_RULE_MASKS = np.array(
+    [sum(_GROUP_BITS[group] for group in required) for required, _ in _INTENT_RULES], dtype=np.int64
+)
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _classify_batch(query_bytes, query_offsets, needles, needle_offsets, needle_bits, rule_masks):
+        """Return the intent code of each query packed in query_bytes."""
+        n_queries = query_offsets.shape[0] - 1
+        codes = np.empty(n_queries, dtype=np.int16)
+        for q in numba.prange(n_queries):
+            begin = query_offsets[q]
+            end = query_offsets[q + 1]
+            matched = 0
+            for k in range(needle_bits.shape[0]):
+                if matched & needle_bits[k]:
+                    continue  # group already matched by another phrase
+                needle_begin = needle_offsets[k]
+                needle_len = needle_offsets[k + 1] - needle_begin
+                for i in range(begin, end - needle_len + 1):
+                    j = 0
+                    while j < needle_len and query_bytes[i + j] == needles[needle_begin + j]:
+                        j += 1
+                    if j == needle_len:
+                        matched |= needle_bits[k]
+                        break
+            code = rule_masks.shape[0]  # general_query
+            for r in range(rule_masks.shape[0]):
+                if matched & rule_masks[r] == rule_masks[r]:
+                    code = r
+                    break
+            codes[q] = code
+        return codes
+
+def interpret_query_batch(queries: List[str]) -> np.ndarray:
+    """
+    Classify many queries at once for offline analytics.
+
+    Returns an int16 array of intent codes; INTENT_NAMES[code] gives the intent
+    that interpret_query would report. Uses a Numba-compiled parallel scan when
+    numba is installed, otherwise loops over interpret_query. Interactive
+    single-query calls should keep using interpret_query.
+    """
+    if numba is None:
+        codes = {name: code for code, name in enumerate(INTENT_NAMES)}
+        return np.array([codes[interpret_query(q)['intent']] for q in queries], dtype=np.int16)
+    
+    encoded = [q.lower().encode('utf-8') for q in queries]
+    query_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    query_offsets = np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64)
+    return _classify_batch(query_bytes, query_offsets, _NEEDLES, _NEEDLE_OFFSETS, _NEEDLE_BITS, _RULE_MASKS)
+
+# Seconds a semantically cached answer stays valid, per read-only intent.
+# Intents not listed here are never answered from the semantic cache.
+SEMANTIC_CACHE_TTLS = {
+    "hr_dashboard": 60,
+    "search_employees": 30,
+    "check_leave_balance": 300,
+    "org_chart": 60,
+    "compensation_report": 60,
+    "turnover_analysis": 60,
+}
+
+# Words that do not change which entity a question is about
+_FILLER_WORDS = frozenset(
+    word for phrase in _INTENT_KEYWORDS for word in phrase.split()
+) | frozenset((
+    'a', 'an', 'the', 'me', 'my', 'our', 'all', 'show', 'list', 'get', 'give', 'display',
+    'generate', 'check', 'what', 'whats', 'is', 'are', 'of', 'for', 'in', 'on', 'to', 'please',
+    'current', 'hr', 'employee', 'employees', 'how', 'many', 'much', 'does', 'do', 'have',
+    'has', 'left', 'days', 'can', 'you', 'tell', 'about', 'by', 'with', 'and', 'company',
+))
+
+_TOKEN_RE = re.compile(r"[\w.@+-]+")
+
+def _canonical_query(query: str) -> str:
+    return ' '.join(query.lower().split()).rstrip('?.!')
+
+def _entity_signature(query: str) -> frozenset:
+    """Names, numbers, emails and other specific words the answer depends on."""
+    query = query.lower().replace("'s", "").replace("’s", "")
+    words = (word.strip('.+-') for word in _TOKEN_RE.findall(query))
+    return frozenset(word for word in words if word and word not in _FILLER_WORDS)
+
+class SemanticCache:
+    """
+    Reuse answers to near-duplicate read-only questions.
+
+    Queries are embedded with an Ollama embedding model and compared by cosine
+    similarity. A cached answer is only reused for the same intent and the same
+    entity signature, within the intent's TTL. Any mutating tool call clears it.
+    """
+
+    def __init__(self, embed_model: str, threshold: float = 0.92, max_entries: int = 1024):
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        self.generation += 1
+        # (expires_at, intent, signature, response, vector), rows of the index in order
+        self._entries: List[Tuple[float, str, frozenset, str, np.ndarray]] = []
+        self._index = None
+
+    async def embed(self, query: str) -> Optional[np.ndarray]:
+        """L2-normalized embedding of the query, or None if the model is unreachable."""
+        try:
+            result = await llm.async_client.embed(model=self.embed_model, input=_canonical_query(query))
+        except Exception:
+            return None
+        vector = np.asarray(result.embeddings[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, vector: np.ndarray, intent: str, signature: frozenset) -> Optional[str]:
+        if not self._entries:
+            return None
+        k = min(len(self._entries), 16)
+        if faiss is not None:
+            scores, ids = self._index.search(vector[None], k)
+            candidates = zip(scores[0], ids[0])
+        else:
+            scores = self._index @ vector
+            candidates = ((scores[i], i) for i in np.argsort(-scores)[:k])
+        now = time.monotonic()
+        for score, i in candidates:
+            if score < self.threshold:
+                break
+            expires_at, entry_intent, entry_signature, response, _ = self._entries[i]
+            if expires_at > now and entry_intent == intent and entry_signature == signature:
+                return response
+        return None
+
+    def insert(self, vector: np.ndarray, intent: str, signature: frozenset, response: str, generation: int):
+        """Cache an answer unless the cache was cleared since the question was asked."""
+        if generation != self.generation:
+            return
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            live = [entry for entry in self._entries if entry[0] > now]
+            self._entries = live[-(self.max_entries // 2):]
+            self._rebuild_index()
+        self._entries.append((time.monotonic() + SEMANTIC_CACHE_TTLS[intent], intent, signature, response, vector))
+        if faiss is not None:
+            if self._index is None:
+                self._index = faiss.IndexFlatIP(vector.shape[0])
+            self._index.add(vector[None])
+        else:
+            self._index = vector[None] if self._index is None else np.vstack([self._index, vector])
+
+    def _rebuild_index(self):
+        vectors = [entry[4] for entry in self._entries]
+        if not vectors:
+            self._index = None
+        elif faiss is not None:
+            self._index = faiss.IndexFlatIP(vectors[0].shape[0])
+            self._index.add(np.vstack(vectors))
+        else:
+            self._index = np.vstack(vectors)
+
+# Opt-in: set HR_SEMANTIC_CACHE_MODEL to an Ollama embedding model, e.g. nomic-embed-text
+SEMANTIC_CACHE_MODEL = os.environ.get("HR_SEMANTIC_CACHE_MODEL")
+semantic_cache = SemanticCache(SEMANTIC_CACHE_MODEL) if SEMANTIC_CACHE_MODEL else None
+
+_EMP_TEMPLATE = """
+**{first_name} {last_name}** ({employee_id})
+- Email: {email}
+- Department: {department_name}
+- Position: {position_title}
+- Manager: {manager_name}
+- Status: {employment_status}
+- Hire Date: {hire_date}
+"""
+
+# Name and ID render blank when missing; every other field renders 'N/A'
+_EMP_DEFAULTS = {'first_name': '', 'last_name': '', 'employee_id': ''}
+
 def format_employee_info(employee: Dict[str, Any]) -> str:
     """Format employee information for display."""
-    return f"""
-**{employee.get('first_name', '')} {employee.get('last_name', '')}** ({employee.get('employee_id', '')})
-- Email: {employee.get('email', 'N/A')}
-- Department: {employee.get('department_name', 'N/A')}
-- Position: {employee.get('position_title', 'N/A')}
-- Manager: {employee.get('manager_name', 'N/A')}
-- Status: {employee.get('employment_status', 'N/A')}
-- Hire Date: {employee.get('hire_date', 'N/A')}
-"""
+    fields = defaultdict(lambda: 'N/A', _EMP_DEFAULTS)
+    fields.update(employee)
+    return _EMP_TEMPLATE.format_map(fields)
 
 def format_leave_balance(balance_data: Dict[str, Any]) -> str:
     """Format leave balance information."""
     if not balance_data.get('balances'):
         return "No leave balance data available."
     
-    output = f"**Leave Balance for {balance_data['employee']} ({balance_data['year']})**\n\n"
-    
-    for balance in balance_data['balances']:
-        output += f"**{balance['leave_type']}**\n"
-        output += f"- Entitled: {balance['entitled_days']} days\n"
-        output += f"- Used: {balance['used_days']} days\n"
-        output += f"- Remaining: {balance['remaining_days']} days\n\n"
+    parts = [f"**Leave Balance for {balance_data['employee']} ({balance_data['year']})**\n\n"]
+    parts.extend(
+        f"**{balance['leave_type']}**\n"
+        f"- Entitled: {balance['entitled_days']} days\n"
+        f"- Used: {balance['used_days']} days\n"
+        f"- Remaining: {balance['remaining_days']} days\n\n"
+        for balance in balance_data['balances']
+    )
     
     if balance_data.get('pending_requests'):
-        output += "\n**Pending Requests:**\n"
-        for request in balance_data['pending_requests']:
-            output += f"- {request['leave_type']}: {request['start_date']} to {request['end_date']} ({request['days_requested']} days)\n"
+        parts.append("\n**Pending Requests:**\n")
+        parts.extend(
+            f"- {request['leave_type']}: {request['start_date']} to {request['end_date']} ({request['days_requested']} days)\n"
+            for request in balance_data['pending_requests']
+        )
     
-    return output
+    return "".join(parts)
 
 def format_dashboard(dashboard: Dict[str, Any]) -> str:
     """Format HR dashboard data."""
     stats = dashboard.get('employee_statistics', {})
     
-    output = "**HR Dashboard Summary**\n\n"
-    output += f"**Employee Statistics:**\n"
-    output += f"- Total Employees: {stats.get('total', 0)}\n"
-    output += f"- Active: {stats.get('active', 0)}\n"
-    output += f"- Full-time: {stats.get('full_time', 0)}\n"
-    output += f"- Part-time: {stats.get('part_time', 0)}\n"
-    output += f"- Contractors: {stats.get('contractors', 0)}\n\n"
+    parts = [
+        "**HR Dashboard Summary**\n\n"
+        "**Employee Statistics:**\n"
+        f"- Total Employees: {stats.get('total', 0)}\n"
+        f"- Active: {stats.get('active', 0)}\n"
+        f"- Full-time: {stats.get('full_time', 0)}\n"
+        f"- Part-time: {stats.get('part_time', 0)}\n"
+        f"- Contractors: {stats.get('contractors', 0)}\n\n"
+    ]
     
     if dashboard.get('department_distribution'):
-        output += "**Department Distribution:**\n"
-        for dept in dashboard['department_distribution']:
-            output += f"- {dept['name']}: {dept['count']} employees\n"
+        parts.append("**Department Distribution:**\n")
+        parts.extend(
+            f"- {dept['name']}: {dept['count']} employees\n"
+            for dept in dashboard['department_distribution']
+        )
     
     if dashboard.get('recent_activity'):
         activity = dashboard['recent_activity']
-        output += f"\n**Recent Activity:**\n"
-        output += f"- New hires (90 days): {activity.get('new_hires_90_days', 0)}\n"
-        output += f"- Pending reviews: {activity.get('pending_performance_reviews', 0)}\n"
-        output += f"- Pending leave requests: {activity.get('pending_leave_requests', 0)}\n"
+        parts.append(
+            "\n**Recent Activity:**\n"
+            f"- New hires (90 days): {activity.get('new_hires_90_days', 0)}\n"
+            f"- Pending reviews: {activity.get('pending_performance_reviews', 0)}\n"
+            f"- Pending leave requests: {activity.get('pending_leave_requests', 0)}\n"
+        )
+    
+    return "".join(parts)
+
+class PersistentMCPClient(BasicMCPClient):
+    """
+    MCP client that keeps one server session open for its whole lifetime.
+
+    BasicMCPClient opens a new connection and repeats the MCP handshake for
+    every call. Inside `async with client:` all calls share a single session;
+    outside of it the client behaves like BasicMCPClient.
+    """
     
-    return output
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session = None
+        self._exit_stack = None
+    
+    async def __aenter__(self):
+        self._exit_stack = AsyncExitStack()
+        self._session = await self._exit_stack.enter_async_context(super()._run_session())
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the shared session and the HTTP connection pool."""
+        self._session = None
+        if self._exit_stack is not None:
+            exit_stack, self._exit_stack = self._exit_stack, None
+            await exit_stack.aclose()
+        if not self.client_provided:
+            await self.http_client.aclose()
+    
+    @asynccontextmanager
+    async def _run_session(self):
+        if self._session is not None:
+            yield self._session
+        else:
+            async with super()._run_session() as session:
+                yield session
 
-async def get_agent(tools: McpToolSpec):
-    """Create and return a FunctionAgent with the given tools."""
-    tools = await tools.to_tool_list_async()
+async def get_agent(tools: McpToolSpec) -> Tuple[FunctionAgent, List[AsyncBaseTool]]:
+    """Create a FunctionAgent with the given tools; returns the agent and its tool list."""
+    tools = [CachedTool(tool) for tool in await tools.to_tool_list_async()]
     agent = FunctionAgent(
         name="HRAgent",
         tools=tools,
         llm=llm,
         system_prompt=SYSTEM_PROMPT,
     )
-    return agent
+    return agent, tools
+
+# Result formatters keyed by a field that identifies the tool output; first hit wins
+_OUTPUT_FORMATTERS = (
+    ('balances', format_leave_balance),
+    ('employee_statistics', format_dashboard),
+)
+
+if orjson is not None:
+    def _pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+else:
+    def _pretty(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+def _print_tool_call(event: ToolCall):
+    print(f"🔧 Calling tool: {event.tool_name}")
+    if event.tool_kwargs:
+        print(f"   Parameters: {_pretty(event.tool_kwargs)}")
+
+def format_employee_list(employees: List[Dict[str, Any]], limit: int = 5) -> str:
+    """Format the first few employees of a search result."""
+    parts = [f"\nFound {len(employees)} employees:"]
+    parts.extend(format_employee_info(emp) for emp in employees[:limit])
+    return "\n".join(parts)
+
+def _tool_result_data(output: ToolOutput) -> Any:
+    """
+    The value an MCP tool returned, decoded from its ToolOutput; None if it isn't JSON.
+
+    FastMCP sends the value as structured content wrapped as {"result": ...}, plus one
+    JSON text block per list item (or one for the whole value); the text blocks are
+    only used when the server sends no structured content.
+    """
+    raw = output.raw_output
+    if isinstance(raw, (dict, list)):
+        return raw
+    structured = getattr(raw, 'structuredContent', None)
+    if structured is not None:
+        return structured['result'] if set(structured) == {'result'} else structured
+    try:
+        values = [json.loads(block.text) for block in getattr(raw, 'content', None) or []
+                  if getattr(block, 'text', None) is not None]
+    except ValueError:
+        return None
+    return values[0] if len(values) == 1 else values
+
+def _print_tool_result(event: ToolCallResult):
+    output = event.tool_output
+    if output.is_error or getattr(output.raw_output, 'isError', False):
+        print(f"❌ Tool failed: {output.content}")
+        return
+    data = _tool_result_data(output)
+    
+    if isinstance(data, list):
+        print(f"✅ Tool result received")
+        if data and isinstance(data[0], dict) and 'employee_id' in data[0]:
+            print(format_employee_list(data))
+        return
+    if not isinstance(data, dict):
+        print(f"✅ Tool result received")
+        return
+    
+    # Check for errors first
+    if data.get('success') == False:
+        print(f"❌ Tool failed: {data.get('error', 'Unknown error')}")
+        if 'email' in data.get('error', '').lower():
+            print("⚠️ IMPORTANT: Employee was NOT added. Please provide email address.")
+        return
+    
+    print(f"✅ Tool result received")
+    # Format specific tool results for better display
+    for key, formatter in _OUTPUT_FORMATTERS:
+        if key in data:
+            print(formatter(data))
+            break
+
+# Stream event handlers used in verbose mode, looked up by exact event type
+_VERBOSE_HANDLERS = {
+    ToolCall: _print_tool_call,
+    ToolCallResult: _print_tool_result,
+}
+
+# Contexts that already received FEW_SHOT_MESSAGES
+_PRIMED_CONTEXTS: "weakref.WeakSet[Context]" = weakref.WeakSet()
+
+async def _remember_exchange(agent: FunctionAgent, agent_context: Context, user_message: str, response: str):
+    """
+    Record a turn answered without the agent in the context's memory, as agent.run
+    would have, so follow-up questions still see it.
+    """
+    memory = await agent_context.store.get("memory", default=None)
+    if memory is None:
+        memory = ChatMemoryBuffer.from_defaults(llm=agent.llm)
+        await agent_context.store.set("memory", memory)
+    if agent_context not in _PRIMED_CONTEXTS:
+        _PRIMED_CONTEXTS.add(agent_context)
+        await memory.aset(list(FEW_SHOT_MESSAGES))
+    await memory.aput_messages([
+        ChatMessage(role="user", content=user_message),
+        ChatMessage(role="assistant", content=response),
+    ])
 
 async def handle_user_message(
         message_content: str,
         agent: FunctionAgent,
         agent_context: Context,
         verbose: bool = False,
-):
-    """Handle a user message using the agent with context awareness."""
+) -> AsyncIterator[str]:
+    """
+    Handle a user message using the agent with context awareness.
+    
+    Yields the response text as the LLM generates it. If the model produced no
+    streamed text, the final response is yielded once the run completes.
+    """
     # Interpret the query
     query_info = interpret_query(message_content)
     
@@ -244,43 +929,99 @@ async def handle_user_message(
             print(f"⚠️ WARNING: {query_info['warning']}")
     
     # Add context to the message if needed
-    enhanced_message = message_content
-    if query_info['context'] in CONTEXT_PROMPTS:
-        enhanced_message = f"{CONTEXT_PROMPTS[query_info['context']]}\n\nUser query: {message_content}"
+    enhanced_message = _CONTEXT_PREFIX.get(query_info['context'], '') + message_content
+    
+    # Near-duplicate read-only questions can be answered without the LLM
+    vector = None
+    if semantic_cache is not None and query_info['intent'] in SEMANTIC_CACHE_TTLS:
+        generation = semantic_cache.generation
+        signature = _entity_signature(message_content)
+        vector = await semantic_cache.embed(message_content)
+        if vector is not None:
+            cached = semantic_cache.lookup(vector, query_info['intent'], signature)
+            if cached is not None:
+                if verbose:
+                    print("♻️ Answered from the semantic cache")
+                await _remember_exchange(agent, agent_context, enhanced_message, cached)
+                yield cached
+                return
     
-    handler = agent.run(enhanced_message, ctx=agent_context)
+    # Seed each new conversation with the example exchange
+    if agent_context in _PRIMED_CONTEXTS:
+        handler = agent.run(enhanced_message, ctx=agent_context)
+    else:
+        _PRIMED_CONTEXTS.add(agent_context)
+        handler = agent.run(enhanced_message, ctx=agent_context, chat_history=list(FEW_SHOT_MESSAGES))
     
+    handlers = _VERBOSE_HANDLERS if verbose else {}
+    chunks = []
+    tool_failed = False
     async for event in handler.stream_events():
-        if verbose and type(event) == ToolCall:
-            print(f"🔧 Calling tool: {event.tool_name}")
-            if event.tool_kwargs:
-                print(f"   Parameters: {json.dumps(event.tool_kwargs, indent=2)}")
-        elif verbose and type(event) == ToolCallResult:
-            # Check for errors first
-            if isinstance(event.tool_output, dict) and event.tool_output.get('success') == False:
-                print(f"❌ Tool failed: {event.tool_output.get('error', 'Unknown error')}")
-                if 'email' in event.tool_output.get('error', '').lower():
-                    print("⚠️ IMPORTANT: Employee was NOT added. Please provide email address.")
-            else:
-                print(f"✅ Tool result received")
-                # Format specific tool results for better display
-                if isinstance(event.tool_output, dict):
-                    if 'balances' in event.tool_output:
-                        print(format_leave_balance(event.tool_output))
-                    elif 'employee_statistics' in event.tool_output:
-                        print(format_dashboard(event.tool_output))
-                    elif isinstance(event.tool_output, list) and len(event.tool_output) > 0:
-                        if 'employee_id' in event.tool_output[0]:
-                            print(f"\nFound {len(event.tool_output)} employees:")
-                            for emp in event.tool_output[:5]:  # Show first 5
-                                print(format_employee_info(emp))
+        if type(event) is AgentStream:
+            if event.delta:
+                chunks.append(event.delta)
+                yield event.delta
+            continue
+        if type(event) is ToolCallResult and event.tool_output.is_error:
+            tool_failed = True
+        h = handlers.get(type(event))
+        if h:
+            h(event)
 
     response = await handler
-    return str(response)
+    if not chunks:
+        chunks.append(str(response))
+        yield chunks[0]
+    
+    if vector is not None and not tool_failed:
+        semantic_cache.insert(vector, query_info['intent'], signature, "".join(chunks), generation)
 
-def print_help():
-    """Print help information for the HR system."""
-    print("""
+async def serve(message: str, agent: FunctionAgent, verbose: bool = False) -> str:
+    """Answer one stand-alone request in its own agent context."""
+    chunks = [chunk async for chunk in handle_user_message(message, agent, Context(agent), verbose=verbose)]
+    return "".join(chunks)
+
+async def stream_batch(
+        messages: List[str],
+        agent: FunctionAgent,
+        max_inflight: int = 32,
+) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Run many requests concurrently, yielding (index, response) as each completes.
+
+    All requests share one agent, but each gets its own Context so their
+    conversations never mix. At most max_inflight agent turns run at once.
+    """
+    semaphore = asyncio.Semaphore(max_inflight)
+    
+    async def run_one(index: int, message: str) -> Tuple[int, str]:
+        async with semaphore:
+            try:
+                return index, await serve(message, agent)
+            except Exception as e:
+                return index, f"❌ Error: {str(e)}"
+    
+    tasks = [asyncio.ensure_future(run_one(i, message)) for i, message in enumerate(messages)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def run_batch(
+        messages: List[str],
+        agent: FunctionAgent,
+        max_inflight: int = 32,
+) -> List[str]:
+    """Run many requests concurrently and return the responses in input order."""
+    responses = [""] * len(messages)
+    async for index, response in stream_batch(messages, agent, max_inflight):
+        responses[index] = response
+    return responses
+
+# Help shown at startup and on "help"
+_HELP_TEXT = """
 📋 **HR Management System - Natural Language Commands**
 
 **Employee Management:**
@@ -329,41 +1070,72 @@ def print_help():
 
 Type 'help' to see this message again.
 Type 'exit' to quit.
-""")
 
-async def main():
+"""
+
+def print_help():
+    """Print help information for the HR system."""
+    sys.stdout.write(_HELP_TEXT)
+
+# Example queries shown once when the interactive session starts
+_EXAMPLES_TEXT = """
+💡 **Example queries to try:**
+1. 'Generate HR dashboard'
+2. 'List all employees'
+3. 'Add Michael Brown (michael.brown@company.com) to Product as Product Manager with salary $115,000'
+4. 'Find all employees in Engineering department'
+5. 'Check Sarah Johnson's leave balance'  # Uses check_employee_leave_balance automatically
+6. 'Update John Doe's salary to $100,000 effective next month'  # Uses update_employee_salary automatically
+7. 'Submit leave request for Jane Smith from Dec 20 to Dec 27'  # Uses submit_leave_request automatically
+
+⚠️ REMEMBER: Always include EMAIL when adding new employees!
+
+"""
+
+# REPL turns handled by one agent Context before it is replaced with a fresh one
+CONTEXT_RESET_TURNS = 50
+
+async def main(batch_file: Optional[str] = None, max_inflight: int = 32):
     """Initialize MCP client and tool spec."""
     print("🚀 Starting HR Management System Client...")
     print("Connecting to MCP server at http://127.0.0.1:8000/sse\n")
     
-    mcp_client = BasicMCPClient("http://127.0.0.1:8000/sse")
+    mcp_client = PersistentMCPClient("http://127.0.0.1:8000/sse")
+    async with mcp_client:
+        await run_client(mcp_client, batch_file, max_inflight)
+
+async def run_client(mcp_client: BasicMCPClient, batch_file: Optional[str], max_inflight: int):
+    """Build the agent on a connected client and run the batch or the REPL."""
     mcp_tool = McpToolSpec(client=mcp_client)
     
     # Get the agent
-    agent = await get_agent(mcp_tool)
+    agent, tools = await get_agent(mcp_tool)
     
     # Create the agent context
     agent_context = Context(agent)
     
     # Print available tools
-    tools = await mcp_tool.to_tool_list_async()
     print(f"✅ Connected! Available HR tools: {len(tools)}\n")
+    print_prompt_token_counts()
+    open_disk_cache()
+    
+    # Non-interactive mode: answer one query per line of the batch file
+    if batch_file:
+        with open(batch_file) as f:
+            messages = [line.strip() for line in f if line.strip()]
+        print(f"📦 Running {len(messages)} queries (up to {max_inflight} at a time)...\n")
+        async for index, response in stream_batch(messages, agent, max_inflight):
+            print(f"👤 [{index + 1}] {messages[index]}\n💬 {response}\n")
+        return
     
     # Show help
     print_help()
     
     # Example queries to demonstrate
-    print("\n💡 **Example queries to try:**")
-    print("1. 'Generate HR dashboard'")
-    print("2. 'List all employees'")
-    print("3. 'Add Michael Brown (michael.brown@company.com) to Product as Product Manager with salary $115,000'")
-    print("4. 'Find all employees in Engineering department'")
-    print("5. 'Check Sarah Johnson's leave balance'  # Uses check_employee_leave_balance automatically")
-    print("6. 'Update John Doe's salary to $100,000 effective next month'  # Uses update_employee_salary automatically")
-    print("7. 'Submit leave request for Jane Smith from Dec 20 to Dec 27'  # Uses submit_leave_request automatically")
-    print("\n⚠️ REMEMBER: Always include EMAIL when adding new employees!\n")
+    sys.stdout.write(_EXAMPLES_TEXT)
     
     # Main interaction loop
+    turns = 0
     while True:
         try:
             user_input = input("\n🤔 HR Assistant> ")
@@ -379,8 +1151,22 @@ async def main():
             print(f"\n👤 You: {user_input}")
             print("\n🤖 Processing...\n")
             
-            response = await handle_user_message(user_input, agent, agent_context, verbose=True)
-            print(f"\n💬 HR Assistant: {response}")
+            # Start a fresh context periodically so a long session's history stays bounded
+            if turns == CONTEXT_RESET_TURNS:
+                agent_context = Context(agent)
+                turns = 0
+                print("🔄 Started a new conversation context\n")
+            turns += 1
+            
+            # Print the answer as it streams; tool call output may come before it
+            started = False
+            async for chunk in handle_user_message(user_input, agent, agent_context, verbose=True):
+                if not started:
+                    sys.stdout.write("\n💬 HR Assistant: ")
+                    started = True
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+            print()
             
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
@@ -390,8 +1176,24 @@ async def main():
             print("Please try rephrasing your request or type 'help' for examples.")
 
 if __name__ == "__main__":
-    # Enable nested async loops (needed for Jupyter notebooks)
-    nest_asyncio.apply()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch", type=str, default=None,
+        help="File with one query per line; answers them concurrently instead of starting the REPL"
+    )
+    parser.add_argument(
+        "--max_inflight", type=int, default=32,
+        help="Maximum concurrent agent turns in batch mode"
+    )
+    args = parser.parse_args()
+    
+    # Enable nested async loops only inside Jupyter/IPython, where a loop is already running;
+    # nest_asyncio patches asyncio in pure Python and does not work with uvloop
+    if in_ipython():
+        nest_asyncio.apply()
+        run = asyncio.run
+    else:
+        run = uvloop.run if uvloop is not None else asyncio.run
     
     # Run the main async function
-    asyncio.run(main())
\ No newline at end of file
+    run(main(args.batch, args.max_inflight))
\ No newline at end of file
@@ -1,247 +1,514 @@
 import sqlite3
 import argparse
+import os
+import queue
+import threading
+import copy
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from mcp.server.fastmcp import FastMCP
-from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Any
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Any
 import json
 import re
 
 mcp = FastMCP('hr-management-system')
 
 # Database connection management
-def get_db_connection():
-    conn = sqlite3.connect('hr_management.db')
+DB_PATH = 'hr_management.db'
+
+# Store dict parameters (audit old/new values) as compact JSON text
+sqlite3.register_adapter(dict, lambda value: json.dumps(value, separators=(',', ':'), default=str))
+
+# Idle connections kept open between tool calls; see configure_pool()
+DEFAULT_POOL_SIZE = int(os.environ.get('HR_DB_POOL_SIZE', 8))
+_POOL: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=DEFAULT_POOL_SIZE)
+
+# Per-connection settings; journal_mode=WAL is persistent and set once in init_db()
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # safe with WAL; fsync at checkpoints, not every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA foreign_keys=ON",
+)
+
+def _open_connection() -> sqlite3.Connection:
+    # Autocommit mode: write paths open their own BEGIN IMMEDIATE transactions
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=512)
     conn.row_factory = sqlite3.Row
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+def configure_pool(size: int):
+    """Set how many idle connections are kept open, closing any beyond the new size."""
+    global _POOL
+    old_pool, _POOL = _POOL, queue.LifoQueue(maxsize=max(size, 1))
+    while True:
+        try:
+            conn = old_pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# Bumped whenever a borrowed connection changed rows; cached reports are keyed on it
+_DATA_VERSION = 0
+_DATA_VERSION_LOCK = threading.Lock()
+
+@contextmanager
+def get_db_connection():
+    """
+    Borrow a database connection for the duration of a with block.
+
+    Connections are reused from a LIFO pool so the most recently used (warmest)
+    one is handed out first. When the pool is empty a new connection is opened
+    instead of waiting, so nested or concurrent tool calls never deadlock; on
+    release, connections beyond the pool size are closed. Any transaction left
+    open by the caller is rolled back before the connection is reused, and
+    _DATA_VERSION is bumped if any rows were changed through it.
+    """
+    global _DATA_VERSION
+    try:
+        conn = _POOL.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    changes = conn.total_changes
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        # total_changes also counts rolled back changes, which only costs a cache miss
+        if conn.total_changes != changes:
+            with _DATA_VERSION_LOCK:
+                _DATA_VERSION += 1
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# employees.employment_status is stored as a code from the employment_statuses table
+_STATUS_CODES = {'active': 1, 'terminated': 2, 'on_leave': 3}
+_ACTIVE, _TERMINATED = _STATUS_CODES['active'], _STATUS_CODES['terminated']
+
+# Hot statements kept as constants so every call hits the same prepared-statement cache entry
+_AUDIT_INSERT_SQL = '''
+    INSERT INTO audit_log (action, entity_type, entity_id, old_values, new_values, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+_EMPLOYEE_PK_SQL = 'SELECT id FROM employees WHERE employee_id = ?'
+_LEAVE_TYPES_SQL = 'SELECT id, days_per_year FROM leave_types'
+_EMPLOYEE_SEQ_SQL = "SELECT seq FROM sqlite_sequence WHERE name = 'employees'"
+# lower() on both sides so the lookup uses idx_employees_name_lower
+_EMPLOYEE_BY_NAME_SQL = '''
+    SELECT e.id, e.employee_id, e.first_name, e.last_name, d.name as department_name
+    FROM employees e
+    LEFT JOIN departments d ON e.department_id = d.id
+    WHERE lower(e.first_name) = lower(?) AND lower(e.last_name) = lower(?)
+'''
+
+# manage_employee('add') name lookups, tagged by kind; a position matches the department the
+# employee is joining (found by name or given by id) or no department at all
+_ADD_EMPLOYEE_LOOKUP_SQL = f'''
+    SELECT 'department' AS kind, id FROM departments WHERE name = :department_name
+    UNION ALL
+    SELECT 'position', id FROM positions
+    WHERE title = :position_title
+    AND (department_id = COALESCE((SELECT id FROM departments WHERE name = :department_name), :department_id)
+         OR department_id IS NULL)
+    UNION ALL
+    SELECT 'manager', id FROM employees
+    WHERE first_name = :manager_first AND last_name = :manager_last AND employment_status = {_ACTIVE}
+'''
+
+# Employee columns manage_employee('update') may change, in the order they appear in the SQL
+_EMPLOYEE_UPDATE_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'department_id', 'position_id',
+                           'manager_id', 'employment_status', 'work_location')
+# How to read those columns for the audit entry when the stored value is a code
+_EMPLOYEE_AUDIT_COLUMNS = {
+    'employment_status': '(SELECT name FROM employment_statuses WHERE id = employment_status) AS employment_status',
+}
+
+_SALARY_BUCKET_COLUMN = '''
+    salary_bucket TEXT GENERATED ALWAYS AS (
+        CASE
+            WHEN base_salary < 50000 THEN 'Under 50k'
+            WHEN base_salary < 75000 THEN '50k-75k'
+            WHEN base_salary < 100000 THEN '75k-100k'
+            WHEN base_salary < 150000 THEN '100k-150k'
+            ELSE 'Over 150k'
+        END
+    ) VIRTUAL
+'''
+
+# employees column definitions, shared by the schema and the legacy table rebuild in init_db()
+_EMPLOYEES_COLUMNS = '''
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id TEXT UNIQUE NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        phone TEXT,
+        date_of_birth DATE,
+        gender TEXT,
+        marital_status TEXT,
+        address TEXT,
+        city TEXT,
+        state TEXT,
+        country TEXT,
+        postal_code TEXT,
+        department_id INTEGER REFERENCES departments(id),
+        position_id INTEGER REFERENCES positions(id),
+        manager_id INTEGER REFERENCES employees(id),
+        hire_date DATE NOT NULL,
+        employment_status INTEGER NOT NULL DEFAULT 1 REFERENCES employment_statuses(id),
+        employment_type TEXT DEFAULT 'full-time',
+        work_location TEXT DEFAULT 'office',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    '''
+
+# Full schema: tables, indexes and the default leave types
+_SCHEMA_SQL = f'''
+    -- Departments table
+    CREATE TABLE IF NOT EXISTS departments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        parent_id INTEGER REFERENCES departments(id),
+        manager_id INTEGER REFERENCES employees(id),
+        budget DECIMAL(15,2),
+        cost_center TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Positions table
+    CREATE TABLE IF NOT EXISTS positions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        department_id INTEGER REFERENCES departments(id),
+        level TEXT,
+        min_salary DECIMAL(10,2),
+        max_salary DECIMAL(10,2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Employment status codes used by employees.employment_status
+    CREATE TABLE IF NOT EXISTS employment_statuses (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    INSERT OR IGNORE INTO employment_statuses (id, name)
+    VALUES (1, 'active'), (2, 'terminated'), (3, 'on_leave');
+
+    -- Employees table (comprehensive)
+    CREATE TABLE IF NOT EXISTS employees ({_EMPLOYEES_COLUMNS});
+
+    -- Salaries table
+    CREATE TABLE IF NOT EXISTS salaries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(id),
+        base_salary DECIMAL(10,2),
+        bonus DECIMAL(10,2),
+        commission DECIMAL(10,2),
+        effective_date DATE,
+        end_date DATE,
+        currency TEXT DEFAULT 'USD',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Leave types
+    CREATE TABLE IF NOT EXISTS leave_types (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        days_per_year INTEGER,
+        carry_forward BOOLEAN DEFAULT FALSE,
+        max_carry_forward INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Leave balances
+    CREATE TABLE IF NOT EXISTS leave_balances (
+        employee_id INTEGER REFERENCES employees(id),
+        leave_type_id INTEGER REFERENCES leave_types(id),
+        year INTEGER,
+        entitled_days INTEGER,
+        used_days DECIMAL(5,2) DEFAULT 0,
+        carried_forward DECIMAL(5,2) DEFAULT 0,
+        remaining_days DECIMAL(5,2),
+        PRIMARY KEY (employee_id, leave_type_id, year)
+    );
+
+    -- Leave requests
+    CREATE TABLE IF NOT EXISTS leave_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(id),
+        leave_type_id INTEGER REFERENCES leave_types(id),
+        start_date DATE,
+        end_date DATE,
+        days_requested DECIMAL(5,2),
+        reason TEXT,
+        status TEXT DEFAULT 'pending',
+        approved_by INTEGER REFERENCES employees(id),
+        approved_date TIMESTAMP,
+        comments TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Performance reviews
+    CREATE TABLE IF NOT EXISTS performance_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(id),
+        reviewer_id INTEGER REFERENCES employees(id),
+        review_period_start DATE,
+        review_period_end DATE,
+        overall_rating INTEGER CHECK(overall_rating >= 1 AND overall_rating <= 5),
+        goals_achieved TEXT,
+        areas_of_improvement TEXT,
+        accomplishments TEXT,
+        next_review_date DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Training programs
+    CREATE TABLE IF NOT EXISTS training_programs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        duration_hours INTEGER,
+        is_mandatory BOOLEAN DEFAULT FALSE,
+        department_specific INTEGER REFERENCES departments(id),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Employee training records
+    CREATE TABLE IF NOT EXISTS employee_training (
+        employee_id INTEGER REFERENCES employees(id),
+        training_id INTEGER REFERENCES training_programs(id),
+        enrollment_date DATE,
+        completion_date DATE,
+        score DECIMAL(5,2),
+        certificate_url TEXT,
+        status TEXT DEFAULT 'enrolled',
+        PRIMARY KEY (employee_id, training_id)
+    );
+
+    -- Trigram full-text index over employee names, kept in step with employees by triggers
+    CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+        first_name, last_name, content='employees', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS employees_fts_insert AFTER INSERT ON employees BEGIN
+        INSERT INTO employees_fts (rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS employees_fts_delete AFTER DELETE ON employees BEGIN
+        INSERT INTO employees_fts (employees_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS employees_fts_update AFTER UPDATE OF first_name, last_name ON employees BEGIN
+        INSERT INTO employees_fts (employees_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+        INSERT INTO employees_fts (rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name);
+    END;
+
+    -- Audit log for compliance
+    CREATE TABLE IF NOT EXISTS audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        action TEXT NOT NULL,
+        entity_type TEXT NOT NULL,
+        entity_id INTEGER,
+        old_values TEXT,
+        new_values TEXT,
+        ip_address TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Indexes for the common lookups; employees.employee_id is already indexed by its UNIQUE constraint
+    CREATE INDEX IF NOT EXISTS idx_salaries_current
+    ON salaries(employee_id, base_salary) WHERE end_date IS NULL;
+    -- (employment_status, department_id) also serves status-only filters, so the older single-column index goes
+    DROP INDEX IF EXISTS idx_employees_status;
+    CREATE INDEX IF NOT EXISTS idx_employees_status_dept ON employees(employment_status, department_id);
+    CREATE INDEX IF NOT EXISTS idx_employees_dept ON employees(department_id);
+    CREATE INDEX IF NOT EXISTS idx_employees_manager ON employees(manager_id);
+    CREATE INDEX IF NOT EXISTS idx_employees_hire ON employees(hire_date);
+    CREATE INDEX IF NOT EXISTS idx_positions_dept ON positions(department_id);
+    CREATE INDEX IF NOT EXISTS idx_employees_name_lower ON employees(lower(first_name), lower(last_name));
+    CREATE INDEX IF NOT EXISTS idx_leave_req_emp_status_start ON leave_requests(employee_id, status, start_date);
+    CREATE INDEX IF NOT EXISTS idx_employees_status_updated ON employees(employment_status, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_pr_emp_next ON performance_reviews(employee_id, next_review_date);
+
+    -- At most one open salary row per employee. Older databases may hold extra open rows;
+    -- close all but the newest, ending each the day before the newest one took effect.
+    UPDATE salaries
+    SET end_date = date((
+        SELECT s2.effective_date FROM salaries s2
+        WHERE s2.id = (SELECT MAX(s3.id) FROM salaries s3
+                       WHERE s3.employee_id = salaries.employee_id AND s3.end_date IS NULL)
+    ), '-1 day')
+    WHERE end_date IS NULL
+    AND id < (SELECT MAX(s3.id) FROM salaries s3
+              WHERE s3.employee_id = salaries.employee_id AND s3.end_date IS NULL);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_one_current_salary ON salaries(employee_id) WHERE end_date IS NULL;
+
+    -- Insert default leave types
+    INSERT OR IGNORE INTO leave_types (name, days_per_year, carry_forward, max_carry_forward)
+    VALUES 
+        ('Annual Leave', 21, TRUE, 10),
+        ('Sick Leave', 10, FALSE, 0),
+        ('Personal Leave', 5, FALSE, 0),
+        ('Maternity Leave', 90, FALSE, 0),
+        ('Paternity Leave', 14, FALSE, 0),
+        ('Bereavement Leave', 3, FALSE, 0);
+'''
+
+# Databases created before status codes have employees.employment_status as TEXT DEFAULT 'active'.
+# CREATE TABLE IF NOT EXISTS can't change that, so the table is rebuilt with the current columns
+# (same column order); its indexes and triggers are then recreated by _SCHEMA_SQL.
+_REBUILD_EMPLOYEES_SQL = f'''
+    UPDATE employees
+    SET employment_status = COALESCE(CASE employment_status
+        {' '.join(f"WHEN '{name}' THEN {code}" for name, code in _STATUS_CODES.items())}
+        ELSE employment_status
+    END, {_ACTIVE});  -- a missing status takes the column default
+    CREATE TABLE employees_rebuild ({_EMPLOYEES_COLUMNS});
+    INSERT INTO employees_rebuild SELECT * FROM employees;
+    -- Keep the AUTOINCREMENT counter, so employee IDs of deleted rows are not handed out again
+    UPDATE sqlite_sequence
+    SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'employees'))
+    WHERE name = 'employees_rebuild';
+    DROP TABLE employees;
+    ALTER TABLE employees_rebuild RENAME TO employees;
+'''
+
 def init_db():
     """Initialize the HR management database with all required tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Departments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS departments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            parent_id INTEGER REFERENCES departments(id),
-            manager_id INTEGER REFERENCES employees(id),
-            budget DECIMAL(15,2),
-            cost_center TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Positions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS positions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            department_id INTEGER REFERENCES departments(id),
-            level TEXT,
-            min_salary DECIMAL(10,2),
-            max_salary DECIMAL(10,2),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Employees table (comprehensive)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id TEXT UNIQUE NOT NULL,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            phone TEXT,
-            date_of_birth DATE,
-            gender TEXT,
-            marital_status TEXT,
-            address TEXT,
-            city TEXT,
-            state TEXT,
-            country TEXT,
-            postal_code TEXT,
-            department_id INTEGER REFERENCES departments(id),
-            position_id INTEGER REFERENCES positions(id),
-            manager_id INTEGER REFERENCES employees(id),
-            hire_date DATE NOT NULL,
-            employment_status TEXT DEFAULT 'active',
-            employment_type TEXT DEFAULT 'full-time',
-            work_location TEXT DEFAULT 'office',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Salaries table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS salaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER REFERENCES employees(id),
-            base_salary DECIMAL(10,2),
-            bonus DECIMAL(10,2),
-            commission DECIMAL(10,2),
-            effective_date DATE,
-            end_date DATE,
-            currency TEXT DEFAULT 'USD',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Leave types
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS leave_types (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            days_per_year INTEGER,
-            carry_forward BOOLEAN DEFAULT FALSE,
-            max_carry_forward INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Leave balances
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS leave_balances (
-            employee_id INTEGER REFERENCES employees(id),
-            leave_type_id INTEGER REFERENCES leave_types(id),
-            year INTEGER,
-            entitled_days INTEGER,
-            used_days DECIMAL(5,2) DEFAULT 0,
-            carried_forward DECIMAL(5,2) DEFAULT 0,
-            remaining_days DECIMAL(5,2),
-            PRIMARY KEY (employee_id, leave_type_id, year)
-        )
-    ''')
-    
-    # Leave requests
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS leave_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER REFERENCES employees(id),
-            leave_type_id INTEGER REFERENCES leave_types(id),
-            start_date DATE,
-            end_date DATE,
-            days_requested DECIMAL(5,2),
-            reason TEXT,
-            status TEXT DEFAULT 'pending',
-            approved_by INTEGER REFERENCES employees(id),
-            approved_date TIMESTAMP,
-            comments TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Performance reviews
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS performance_reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER REFERENCES employees(id),
-            reviewer_id INTEGER REFERENCES employees(id),
-            review_period_start DATE,
-            review_period_end DATE,
-            overall_rating INTEGER CHECK(overall_rating >= 1 AND overall_rating <= 5),
-            goals_achieved TEXT,
-            areas_of_improvement TEXT,
-            accomplishments TEXT,
-            next_review_date DATE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Training programs
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS training_programs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            duration_hours INTEGER,
-            is_mandatory BOOLEAN DEFAULT FALSE,
-            department_specific INTEGER REFERENCES departments(id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Employee training records
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS employee_training (
-            employee_id INTEGER REFERENCES employees(id),
-            training_id INTEGER REFERENCES training_programs(id),
-            enrollment_date DATE,
-            completion_date DATE,
-            score DECIMAL(5,2),
-            certificate_url TEXT,
-            status TEXT DEFAULT 'enrolled',
-            PRIMARY KEY (employee_id, training_id)
-        )
-    ''')
-    
-    # Audit log for compliance
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS audit_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            action TEXT NOT NULL,
-            entity_type TEXT NOT NULL,
-            entity_id INTEGER,
-            old_values TEXT,
-            new_values TEXT,
-            ip_address TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Insert default leave types
-    cursor.execute('''
-        INSERT OR IGNORE INTO leave_types (name, days_per_year, carry_forward, max_carry_forward)
-        VALUES 
-            ('Annual Leave', 21, TRUE, 10),
-            ('Sick Leave', 10, FALSE, 0),
-            ('Personal Leave', 5, FALSE, 0),
-            ('Maternity Leave', 90, FALSE, 0),
-            ('Paternity Leave', 14, FALSE, 0),
-            ('Bereavement Leave', 3, FALSE, 0)
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        # Write-ahead logging lets readers run alongside a writer; it cannot change inside a transaction
+        conn.execute("PRAGMA journal_mode=WAL")
+        
+        # Databases from before the name index need it filled from the existing rows
+        fts_missing = conn.execute(
+            "SELECT NOT EXISTS(SELECT 1 FROM sqlite_master WHERE name = 'employees_fts')"
+        ).fetchone()[0]
+        
+        # A non-INTEGER employment_status column means the employees table predates status codes
+        status_type = conn.execute(
+            "SELECT type FROM pragma_table_info('employees') WHERE name = 'employment_status'"
+        ).fetchone()
+        rebuild_employees = status_type is not None and status_type[0].upper() != 'INTEGER'
+        
+        # All tables, indexes and seed rows are created in one transaction
+        if rebuild_employees:
+            # Other tables reference employees; foreign keys can only be switched off outside a transaction
+            conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            conn.executescript('BEGIN;'
+                               + (_REBUILD_EMPLOYEES_SQL if rebuild_employees else '')
+                               + _SCHEMA_SQL
+                               + ("INSERT INTO employees_fts (employees_fts) VALUES ('rebuild');" if fts_missing else '')
+                               + 'COMMIT;')
+        finally:
+            if rebuild_employees:
+                conn.execute("PRAGMA foreign_keys=ON")
+        
+        # Salary band for the compensation report's distribution, computed by SQLite from base_salary;
+        # a VIRTUAL generated column can be added to existing tables in place
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(salaries)")}
+        if 'salary_bucket' not in columns:
+            conn.execute(f"ALTER TABLE salaries ADD COLUMN {_SALARY_BUCKET_COLUMN}")
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sal_bucket_current
+            ON salaries(salary_bucket, employee_id) WHERE end_date IS NULL
+        ''')
+        
+        # Refresh planner statistics; analysis_limit samples each index so this stays quick on large tables
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
 
 # Helper functions
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_MAX_EMAIL_LENGTH = 254  # RFC 5321 path limit
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    if len(email) > _MAX_EMAIL_LENGTH:
+        return False
+    return _EMAIL_RE.fullmatch(email) is not None
 
-def generate_employee_id() -> str:
-    """Generate unique employee ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM employees")
-    count = cursor.fetchone()['count']
-    conn.close()
-    return f"EMP{str(count + 1).zfill(5)}"
+def _rows_as_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    """Fetch the remaining rows as dicts, zipping plain tuples against column names read once"""
+    cursor.row_factory = None
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def _iter_rows_as_dicts(cursor: sqlite3.Cursor) -> Iterator[Dict[str, Any]]:
+    """Like _rows_as_dicts, but yields each row as SQLite steps to it"""
+    cursor.row_factory = None
+    columns = [col[0] for col in cursor.description]
+    for row in cursor:
+        yield dict(zip(columns, row))
+
+# Small reference tables looked up by name. Only hits are cached (a miss raises KeyError), so newly
+# created rows are found at once; tools that rename or delete departments clear _department_id.
+@lru_cache(maxsize=128)
+def _leave_type_id(name: str) -> int:
+    """leave_types.id for a leave type name; raises KeyError if there is none"""
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT id FROM leave_types WHERE name = ?', (name,)).fetchone()
+    if row is None:
+        raise KeyError(name)
+    return row[0]
+
+@lru_cache(maxsize=128)
+def _department_id(name: str) -> int:
+    """departments.id for a department name; raises KeyError if there is none"""
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT id FROM departments WHERE name = ?', (name,)).fetchone()
+    if row is None:
+        raise KeyError(name)
+    return row[0]
+
+def _emp_pk(cursor: sqlite3.Cursor, employee_id: str) -> Optional[int]:
+    """employees.id for an EMP-style employee ID, or None if there is no such employee"""
+    row = cursor.execute(_EMPLOYEE_PK_SQL, (employee_id,)).fetchone()
+    return row[0] if row else None
+
+def generate_employee_id(cursor: sqlite3.Cursor) -> str:
+    """
+    Generate the employee ID for the next employees row.
+
+    Reads the AUTOINCREMENT counter, so call it inside the caller's write
+    transaction right before the insert; holding the write lock guarantees no
+    other insert can take the same number.
+    """
+    row = cursor.execute(_EMPLOYEE_SEQ_SQL).fetchone()
+    return f"EMP{(row[0] if row else 0) + 1:05d}"
 
 def calculate_leave_days(start_date: str, end_date: str) -> float:
     """Calculate number of days between two dates"""
-    start = datetime.strptime(start_date, '%Y-%m-%d')
-    end = datetime.strptime(end_date, '%Y-%m-%d')
-    return (end - start).days + 1
+    return (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
 
-def log_audit(action: str, entity_type: str, entity_id: int, old_values: dict = None, new_values: dict = None):
-    """Log actions for audit trail"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO audit_log (action, entity_type, entity_id, old_values, new_values)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (action, entity_type, entity_id, 
-          json.dumps(old_values) if old_values else None,
-          json.dumps(new_values) if new_values else None))
-    conn.commit()
-    conn.close()
+def log_audit(action: str, entity_type: str, entity_id: int, old_values: dict = None, new_values: dict = None,
+              *, cursor: sqlite3.Cursor):
+    """
+    Log actions for audit trail.
+
+    The entry is written with the caller's cursor, so it commits or rolls back with
+    the caller's transaction.
+    """
+    # dicts are serialized by the sqlite3 adapter
+    cursor.execute(_AUDIT_INSERT_SQL, (
+        action, entity_type, entity_id, old_values or None, new_values or None,
+        # Same format as SQLite's CURRENT_TIMESTAMP (UTC)
+        datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+    ))
 
 # Employee Management Tools
 @mcp.tool()
@@ -266,224 +533,303 @@ def manage_employee(
     
     Note: Department and position can be specified by name and will be created if they don't exist.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        if action == 'add':
-            # Validate required fields
-            required = ['first_name', 'last_name', 'email']
-            for field in required:
-                if field not in employee_data or not employee_data[field]:
-                    return {"success": False, "error": f"Missing required field: {field}"}
-            
-            # Validate email
-            if not validate_email(employee_data['email']):
-                return {"success": False, "error": "Invalid email format"}
-            
-            # Set hire_date to today if not provided
-            if 'hire_date' not in employee_data or not employee_data['hire_date']:
-                employee_data['hire_date'] = date.today().isoformat()
-            
-            # Generate employee ID
-            employee_id = generate_employee_id()
-            
-            # Handle department by name
-            department_id = None
-            if 'department_name' in employee_data and employee_data['department_name']:
-                cursor.execute('SELECT id FROM departments WHERE name = ?', (employee_data['department_name'],))
-                dept = cursor.fetchone()
-                if dept:
-                    department_id = dept['id']
-                else:
-                    # Create department if it doesn't exist
-                    cursor.execute('INSERT INTO departments (name) VALUES (?)', (employee_data['department_name'],))
-                    department_id = cursor.lastrowid
-            elif 'department_id' in employee_data:
-                department_id = employee_data['department_id']
-            
-            # Handle position by title
-            position_id = None
-            if 'position_title' in employee_data and employee_data['position_title']:
-                cursor.execute('SELECT id FROM positions WHERE title = ? AND (department_id = ? OR department_id IS NULL)', 
-                              (employee_data['position_title'], department_id))
-                pos = cursor.fetchone()
-                if pos:
-                    position_id = pos['id']
-                else:
-                    # Create position if it doesn't exist
-                    cursor.execute('INSERT INTO positions (title, department_id) VALUES (?, ?)', 
-                                  (employee_data['position_title'], department_id))
-                    position_id = cursor.lastrowid
-            elif 'position_id' in employee_data:
-                position_id = employee_data['position_id']
-            
-            # Handle manager by name
-            manager_id = None
-            if 'manager_name' in employee_data and employee_data['manager_name']:
-                # Try to find manager by full name
-                manager_parts = employee_data['manager_name'].split()
-                if len(manager_parts) >= 2:
-                    cursor.execute('''
-                        SELECT id FROM employees 
-                        WHERE first_name = ? AND last_name = ? 
-                        AND employment_status = 'active'
-                    ''', (manager_parts[0], ' '.join(manager_parts[1:])))
-                    manager = cursor.fetchone()
-                    if manager:
-                        manager_id = manager['id']
-            elif 'manager_id' in employee_data:
-                manager_id = employee_data['manager_id']
-            
-            # Insert employee
-            cursor.execute('''
-                INSERT INTO employees (
-                    employee_id, first_name, last_name, email, phone,
-                    date_of_birth, gender, marital_status, address, city,
-                    state, country, postal_code, department_id, position_id,
-                    manager_id, hire_date, employment_type, work_location
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                employee_id,
-                employee_data['first_name'],
-                employee_data['last_name'],
-                employee_data['email'],
-                employee_data.get('phone'),
-                employee_data.get('date_of_birth'),
-                employee_data.get('gender'),
-                employee_data.get('marital_status'),
-                employee_data.get('address'),
-                employee_data.get('city'),
-                employee_data.get('state'),
-                employee_data.get('country', 'USA'),
-                employee_data.get('postal_code'),
-                department_id,
-                position_id,
-                manager_id,
-                employee_data['hire_date'],
-                employee_data.get('employment_type', 'full-time'),
-                employee_data.get('work_location', 'office')
-            ))
-            
-            emp_id = cursor.lastrowid
-            
-            # Add initial salary if provided
-            if 'salary' in employee_data:
-                cursor.execute('''
-                    INSERT INTO salaries (employee_id, base_salary, effective_date)
-                    VALUES (?, ?, ?)
-                ''', (emp_id, employee_data['salary'], employee_data['hire_date']))
-            
-            # Initialize leave balances for current year
-            current_year = datetime.now().year
-            cursor.execute('SELECT id, days_per_year FROM leave_types')
-            leave_types = cursor.fetchall()
-            
-            for leave_type in leave_types:
-                # Pro-rate leave days based on hire date
-                hire_date = datetime.strptime(employee_data['hire_date'], '%Y-%m-%d')
-                if hire_date.year == current_year:
-                    days_remaining = (date(current_year, 12, 31) - hire_date.date()).days
-                    prorated_days = round((leave_type['days_per_year'] * days_remaining) / 365, 1)
-                else:
-                    prorated_days = leave_type['days_per_year']
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        try:
+            if action == 'add':
+                # Validate required fields
+                required = ['first_name', 'last_name', 'email']
+                for field in required:
+                    if field not in employee_data or not employee_data[field]:
+                        return {"success": False, "error": f"Missing required field: {field}"}
+                
+                # Validate email
+                if not validate_email(employee_data['email']):
+                    return {"success": False, "error": "Invalid email format"}
+                
+                # Set hire_date to today if not provided
+                if 'hire_date' not in employee_data or not employee_data['hire_date']:
+                    employee_data['hire_date'] = date.today().isoformat()
+                
+                # One write transaction for the employee, salary, leave balances and audit entry
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                # Generate employee ID
+                employee_id = generate_employee_id(cursor)
+                
+                # Resolve department, position and manager names in one query
+                department_name = employee_data.get('department_name') or None
+                position_title = employee_data.get('position_title') or None
+                manager_parts = (employee_data.get('manager_name') or '').split()
+                lookups = {}
+                cursor.execute(_ADD_EMPLOYEE_LOOKUP_SQL, {
+                    'department_name': department_name,
+                    'department_id': None if department_name else employee_data.get('department_id'),
+                    'position_title': position_title,
+                    'manager_first': manager_parts[0] if len(manager_parts) >= 2 else None,
+                    'manager_last': ' '.join(manager_parts[1:]) if len(manager_parts) >= 2 else None,
+                })
+                for row in cursor.fetchall():
+                    lookups.setdefault(row['kind'], row['id'])
+                
+                # Handle department by name
+                department_id = None
+                if department_name:
+                    department_id = lookups.get('department')
+                    if department_id is None:
+                        # Create department if it doesn't exist
+                        cursor.execute('INSERT INTO departments (name) VALUES (?) RETURNING id', (department_name,))
+                        department_id = cursor.fetchone()[0]
+                elif 'department_id' in employee_data:
+                    department_id = employee_data['department_id']
                 
+                # Handle position by title
+                position_id = None
+                if position_title:
+                    position_id = lookups.get('position')
+                    if position_id is None:
+                        # Create position if it doesn't exist
+                        cursor.execute('INSERT INTO positions (title, department_id) VALUES (?, ?) RETURNING id', 
+                                      (position_title, department_id))
+                        position_id = cursor.fetchone()[0]
+                elif 'position_id' in employee_data:
+                    position_id = employee_data['position_id']
+                
+                # Handle manager by name
+                manager_id = None
+                if 'manager_name' in employee_data and employee_data['manager_name']:
+                    manager_id = lookups.get('manager')
+                elif 'manager_id' in employee_data:
+                    manager_id = employee_data['manager_id']
+                
+                # Insert employee
                 cursor.execute('''
+                    INSERT INTO employees (
+                        employee_id, first_name, last_name, email, phone,
+                        date_of_birth, gender, marital_status, address, city,
+                        state, country, postal_code, department_id, position_id,
+                        manager_id, hire_date, employment_status, employment_type, work_location
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING id
+                ''', (
+                    employee_id,
+                    employee_data['first_name'],
+                    employee_data['last_name'],
+                    employee_data['email'],
+                    employee_data.get('phone'),
+                    employee_data.get('date_of_birth'),
+                    employee_data.get('gender'),
+                    employee_data.get('marital_status'),
+                    employee_data.get('address'),
+                    employee_data.get('city'),
+                    employee_data.get('state'),
+                    employee_data.get('country', 'USA'),
+                    employee_data.get('postal_code'),
+                    department_id,
+                    position_id,
+                    manager_id,
+                    employee_data['hire_date'],
+                    _ACTIVE,
+                    employee_data.get('employment_type', 'full-time'),
+                    employee_data.get('work_location', 'office')
+                ))
+                
+                emp_id = cursor.fetchone()[0]
+                
+                # Add initial salary if provided
+                if 'salary' in employee_data:
+                    cursor.execute('''
+                        INSERT INTO salaries (employee_id, base_salary, effective_date)
+                        VALUES (?, ?, ?)
+                    ''', (emp_id, employee_data['salary'], employee_data['hire_date']))
+                
+                # Initialize leave balances for current year, pro-rated by hire date
+                current_year = datetime.now().year
+                hire_dt = date.fromisoformat(employee_data['hire_date'])
+                days_remaining = (date(current_year, 12, 31) - hire_dt).days
+                cursor.execute(_LEAVE_TYPES_SQL)
+                rows = []
+                for leave_type in cursor.fetchall():
+                    if hire_dt.year == current_year:
+                        prorated_days = round((leave_type['days_per_year'] * days_remaining) / 365, 1)
+                    else:
+                        prorated_days = leave_type['days_per_year']
+                    rows.append((emp_id, leave_type['id'], current_year, prorated_days, prorated_days))
+                
+                cursor.executemany('''
                     INSERT INTO leave_balances (employee_id, leave_type_id, year, entitled_days, remaining_days)
                     VALUES (?, ?, ?, ?, ?)
-                ''', (emp_id, leave_type['id'], current_year, prorated_days, prorated_days))
-            
-            conn.commit()
-            log_audit('CREATE', 'employee', emp_id, None, employee_data)
-            
-            return {
-                "success": True,
-                "employee_id": employee_id,
-                "message": f"Employee {employee_data['first_name']} {employee_data['last_name']} added successfully"
-            }
-        
-        elif action == 'update':
-            if 'employee_id' not in employee_data:
-                return {"success": False, "error": "employee_id required for update"}
-            
-            # Get current employee data for audit
-            cursor.execute('SELECT * FROM employees WHERE employee_id = ?', (employee_data['employee_id'],))
-            current = cursor.fetchone()
-            if not current:
-                return {"success": False, "error": "Employee not found"}
+                ''', rows)
+                
+                log_audit('CREATE', 'employee', emp_id, None, employee_data, cursor=cursor)
+                conn.commit()
+                
+                return {
+                    "success": True,
+                    "employee_id": employee_id,
+                    "message": f"Employee {employee_data['first_name']} {employee_data['last_name']} added successfully"
+                }
             
-            # Build update query
-            update_fields = []
-            values = []
-            for field, value in employee_data.items():
-                if field != 'employee_id' and field in ['first_name', 'last_name', 'email', 'phone',
-                                                         'department_id', 'position_id', 'manager_id',
-                                                         'employment_status', 'work_location']:
-                    update_fields.append(f"{field} = ?")
-                    values.append(value)
+            elif action == 'update':
+                if 'employee_id' not in employee_data:
+                    return {"success": False, "error": "employee_id required for update"}
+                
+                fields = [field for field in _EMPLOYEE_UPDATE_FIELDS if field in employee_data]
+                if 'employment_status' in fields and employee_data['employment_status'] not in _STATUS_CODES:
+                    return {"success": False,
+                            "error": f"employment_status must be one of: {', '.join(_STATUS_CODES)}"}
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                # Get the current values of just the updated columns for audit
+                cursor.execute(f'''
+                    SELECT {', '.join(['id'] + [_EMPLOYEE_AUDIT_COLUMNS.get(field, field) for field in fields])}
+                    FROM employees WHERE employee_id = ?
+                ''', (employee_data['employee_id'],))
+                current = cursor.fetchone()
+                if not current:
+                    return {"success": False, "error": "Employee not found"}
+                
+                if fields:
+                    values = [_STATUS_CODES[employee_data[field]] if field == 'employment_status' else employee_data[field]
+                              for field in fields]
+                    values.append(employee_data['employee_id'])
+                    cursor.execute(f'''
+                        UPDATE employees 
+                        SET {', '.join(f"{field} = ?" for field in fields)}, updated_at = CURRENT_TIMESTAMP
+                        WHERE employee_id = ?
+                    ''', values)
+                    
+                    old_values = {field: current[field] for field in fields}
+                    log_audit('UPDATE', 'employee', current['id'], old_values, employee_data, cursor=cursor)
+                    conn.commit()
+                    
+                    return {"success": True, "message": "Employee updated successfully"}
+                
+                return {"success": False, "error": "No valid fields to update"}
             
-            if update_fields:
-                values.append(employee_data['employee_id'])
+            elif action == 'terminate':
+                if 'employee_id' not in employee_data:
+                    return {"success": False, "error": "employee_id required for termination"}
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                
                 cursor.execute(f'''
                     UPDATE employees 
-                    SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                    SET employment_status = {_TERMINATED}, updated_at = CURRENT_TIMESTAMP
                     WHERE employee_id = ?
-                ''', values)
+                ''', (employee_data['employee_id'],))
+                
+                # End current salary record
+                if 'termination_date' in employee_data:
+                    cursor.execute('''
+                        UPDATE salaries 
+                        SET end_date = ?
+                        WHERE employee_id = (SELECT id FROM employees WHERE employee_id = ?)
+                        AND end_date IS NULL
+                    ''', (employee_data['termination_date'], employee_data['employee_id']))
                 
+                log_audit('TERMINATE', 'employee', employee_data['employee_id'], None, employee_data, cursor=cursor)
                 conn.commit()
-                log_audit('UPDATE', 'employee', current['id'], dict(current), employee_data)
                 
-                return {"success": True, "message": "Employee updated successfully"}
-            
-            return {"success": False, "error": "No valid fields to update"}
-        
-        elif action == 'terminate':
-            if 'employee_id' not in employee_data:
-                return {"success": False, "error": "employee_id required for termination"}
-            
-            cursor.execute('''
-                UPDATE employees 
-                SET employment_status = 'terminated', updated_at = CURRENT_TIMESTAMP
-                WHERE employee_id = ?
-            ''', (employee_data['employee_id'],))
-            
-            # End current salary record
-            if 'termination_date' in employee_data:
-                cursor.execute('''
-                    UPDATE salaries 
-                    SET end_date = ?
-                    WHERE employee_id = (SELECT id FROM employees WHERE employee_id = ?)
-                    AND end_date IS NULL
-                ''', (employee_data['termination_date'], employee_data['employee_id']))
+                return {"success": True, "message": "Employee terminated successfully"}
             
-            conn.commit()
-            log_audit('TERMINATE', 'employee', employee_data['employee_id'], None, employee_data)
-            
-            return {"success": True, "message": "Employee terminated successfully"}
-        
-        elif action == 'reactivate':
-            if 'employee_id' not in employee_data:
-                return {"success": False, "error": "employee_id required for reactivation"}
-            
-            cursor.execute('''
-                UPDATE employees 
-                SET employment_status = 'active', updated_at = CURRENT_TIMESTAMP
-                WHERE employee_id = ?
-            ''', (employee_data['employee_id'],))
-            
-            conn.commit()
-            log_audit('REACTIVATE', 'employee', employee_data['employee_id'], None, None)
-            
-            return {"success": True, "message": "Employee reactivated successfully"}
-        
-        else:
-            return {"success": False, "error": f"Unknown action: {action}"}
+            elif action == 'reactivate':
+                if 'employee_id' not in employee_data:
+                    return {"success": False, "error": "employee_id required for reactivation"}
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                cursor.execute(f'''
+                    UPDATE employees 
+                    SET employment_status = {_ACTIVE}, updated_at = CURRENT_TIMESTAMP
+                    WHERE employee_id = ?
+                ''', (employee_data['employee_id'],))
+                
+                log_audit('REACTIVATE', 'employee', employee_data['employee_id'], None, None, cursor=cursor)
+                conn.commit()
+                
+                return {"success": True, "message": "Employee reactivated successfully"}
             
-    except Exception as e:
-        conn.rollback()
-        return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
+            else:
+                return {"success": False, "error": f"Unknown action: {action}"}
+                
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "error": str(e)}
+
+_SEARCH_EMPLOYEES_SQL = '''
+    SELECT 
+        e.employee_id,
+        e.first_name,
+        e.last_name,
+        e.email,
+        e.phone,
+        es.name as employment_status,
+        e.hire_date,
+        d.name as department_name,
+        p.title as position_title,
+        m.first_name || ' ' || m.last_name as manager_name,
+        s.base_salary as current_salary
+    FROM employees e
+    LEFT JOIN departments d ON e.department_id = d.id
+    LEFT JOIN positions p ON e.position_id = p.id
+    LEFT JOIN employees m ON e.manager_id = m.id
+    LEFT JOIN salaries s ON s.employee_id = e.id AND s.end_date IS NULL
+    LEFT JOIN employment_statuses es ON es.id = e.employment_status
+'''
+
+def _contains(value):
+    return (f"%{value}%",)
+
+def _equals(value):
+    return (value,)
+
+def _fts_phrase(value):
+    # Quote as one FTS5 string so the trigram index matches it as a substring, like LIKE '%value%'
+    return ('"' + str(value).replace('"', '""') + '"',)
+
+# Trigrams need at least three characters; shorter names fall back to LIKE
+_FTS_MIN_LENGTH = 3
+
+# search_employees filters as (criteria key, applies-to-value check, SQL, bind parameters);
+# the first matching entry for a key wins, and the order fixes the shape of the generated SQL
+_SEARCH_CLAUSES = (
+    ('name', lambda v: len(str(v)) >= _FTS_MIN_LENGTH,
+     "e.id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?)", _fts_phrase),
+    ('name', None, "(e.first_name LIKE ? OR e.last_name LIKE ?)", lambda v: _contains(v) * 2),
+    ('department', lambda v: isinstance(v, int), "e.department_id = ?", _equals),
+    ('department', None, "d.name LIKE ?", _contains),
+    ('position', None, "p.title LIKE ?", _contains),
+    ('status', None, "e.employment_status = ?", lambda v: (_STATUS_CODES.get(v, v),)),
+    ('manager', lambda v: v.startswith('EMP'), "m.employee_id = ?", _equals),
+    ('manager', None, "(m.first_name LIKE ? OR m.last_name LIKE ?)", lambda v: _contains(v) * 2),
+    ('hire_date_from', None, "e.hire_date >= ?", _equals),
+    ('hire_date_to', None, "e.hire_date <= ?", _equals),
+    ('location', None, "e.work_location = ?", _equals),
+)
+
+@lru_cache(maxsize=None)
+def _search_employees_sql(clause_ids: tuple) -> str:
+    """SQL for one combination of _SEARCH_CLAUSES, built once so the text stays stable for the statement cache"""
+    if not clause_ids:
+        return _SEARCH_EMPLOYEES_SQL
+    return _SEARCH_EMPLOYEES_SQL + "WHERE " + " AND ".join(_SEARCH_CLAUSES[i][2] for i in clause_ids)
+
+def _search_employees_query(criteria: Dict[str, Any]):
+    """SQL and parameters for search_employees criteria"""
+    clause_ids = []
+    params = []
+    matched = set()
+    for clause_id, (key, applies, _, bind) in enumerate(_SEARCH_CLAUSES):
+        value = criteria.get(key)
+        if not value or key in matched or (applies is not None and not applies(value)):
+            continue
+        matched.add(key)
+        clause_ids.append(clause_id)
+        params.extend(bind(value))
+    return _search_employees_sql(tuple(clause_ids)), params
 
 @mcp.tool()
 def search_employees(
@@ -506,86 +852,20 @@ def search_employees(
     Returns:
         List of employee records matching criteria
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    query = '''
-        SELECT 
-            e.employee_id,
-            e.first_name,
-            e.last_name,
-            e.email,
-            e.phone,
-            e.employment_status,
-            e.hire_date,
-            d.name as department_name,
-            p.title as position_title,
-            m.first_name || ' ' || m.last_name as manager_name,
-            s.base_salary as current_salary
-        FROM employees e
-        LEFT JOIN departments d ON e.department_id = d.id
-        LEFT JOIN positions p ON e.position_id = p.id
-        LEFT JOIN employees m ON e.manager_id = m.id
-        LEFT JOIN (
-            SELECT employee_id, base_salary
-            FROM salaries
-            WHERE end_date IS NULL
-        ) s ON e.id = s.employee_id
-        WHERE 1=1
-    '''
-    
-    params = []
-    
-    if criteria.get('name'):
-        query += " AND (e.first_name LIKE ? OR e.last_name LIKE ?)"
-        name_pattern = f"%{criteria['name']}%"
-        params.extend([name_pattern, name_pattern])
-    
-    if criteria.get('department'):
-        if isinstance(criteria['department'], int):
-            query += " AND e.department_id = ?"
-            params.append(criteria['department'])
-        else:
-            query += " AND d.name LIKE ?"
-            params.append(f"%{criteria['department']}%")
-    
-    if criteria.get('position'):
-        query += " AND p.title LIKE ?"
-        params.append(f"%{criteria['position']}%")
-    
-    if criteria.get('status'):
-        query += " AND e.employment_status = ?"
-        params.append(criteria['status'])
-    
-    if criteria.get('manager'):
-        if criteria['manager'].startswith('EMP'):
-            query += " AND m.employee_id = ?"
-            params.append(criteria['manager'])
-        else:
-            query += " AND (m.first_name LIKE ? OR m.last_name LIKE ?)"
-            manager_pattern = f"%{criteria['manager']}%"
-            params.extend([manager_pattern, manager_pattern])
-    
-    if criteria.get('hire_date_from'):
-        query += " AND e.hire_date >= ?"
-        params.append(criteria['hire_date_from'])
-    
-    if criteria.get('hire_date_to'):
-        query += " AND e.hire_date <= ?"
-        params.append(criteria['hire_date_to'])
-    
-    if criteria.get('location'):
-        query += " AND e.work_location = ?"
-        params.append(criteria['location'])
-    
-    cursor.execute(query, params)
-    
-    results = []
-    for row in cursor.fetchall():
-        results.append(dict(row))
-    
-    conn.close()
-    return results
+    query, params = _search_employees_query(criteria)
+    with get_db_connection() as conn:
+        return _rows_as_dicts(conn.execute(query, params))
+
+def iter_search_employees(criteria: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream search_employees results one record at a time.
+
+    A pooled connection is held until the generator is exhausted or closed, so
+    callers should consume it promptly.
+    """
+    query, params = _search_employees_query(criteria)
+    with get_db_connection() as conn:
+        yield from _iter_rows_as_dicts(conn.execute(query, params))
 
 # Organizational Structure Tools
 @mcp.tool()
@@ -603,68 +883,65 @@ def get_org_chart(
     Returns:
         Hierarchical organization structure
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    def build_hierarchy(manager_id=None, dept_id=None):
-        if dept_id:
-            cursor.execute('''
-                SELECT 
-                    e.id, e.employee_id, e.first_name, e.last_name,
-                    p.title, d.name as department
-                FROM employees e
-                LEFT JOIN positions p ON e.position_id = p.id
-                LEFT JOIN departments d ON e.department_id = d.id
-                WHERE e.department_id = ? AND e.employment_status = 'active'
-                AND (e.manager_id = ? OR (? IS NULL AND e.manager_id IS NULL))
-            ''', (dept_id, manager_id, manager_id))
-        else:
-            cursor.execute('''
-                SELECT 
-                    e.id, e.employee_id, e.first_name, e.last_name,
-                    p.title, d.name as department
-                FROM employees e
-                LEFT JOIN positions p ON e.position_id = p.id
-                LEFT JOIN departments d ON e.department_id = d.id
-                WHERE e.employment_status = 'active'
-                AND (e.manager_id = ? OR (? IS NULL AND e.manager_id IS NULL))
-            ''', (manager_id, manager_id))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
-        employees = cursor.fetchall()
+        # Walk the whole reporting tree in one statement; the department
+        # filter applies at every level, as managers outside it are not shown
+        cursor.execute(f'''
+            WITH RECURSIVE org(id, manager_id) AS (
+                SELECT id, manager_id FROM employees
+                WHERE manager_id IS NULL AND employment_status = {_ACTIVE}
+                AND (:dept_id IS NULL OR department_id = :dept_id)
+                UNION ALL
+                SELECT e.id, e.manager_id
+                FROM employees e
+                JOIN org ON e.manager_id = org.id
+                WHERE :all_levels AND e.employment_status = {_ACTIVE}
+                AND (:dept_id IS NULL OR e.department_id = :dept_id)
+            )
+            SELECT 
+                e.id, e.manager_id, e.employee_id, e.first_name, e.last_name,
+                p.title, d.name as department
+            FROM org
+            JOIN employees e ON e.id = org.id
+            LEFT JOIN positions p ON e.position_id = p.id
+            LEFT JOIN departments d ON e.department_id = d.id
+            ORDER BY e.id
+        ''', {"dept_id": department_id or None, "all_levels": bool(include_all_levels)})
         
-        org_structure = []
-        for emp in employees:
+        # Group the flat rows by manager, then hang each group under its manager
+        nodes = {}
+        reports_by_manager = {}
+        for emp in cursor.fetchall():
             emp_dict = {
                 "employee_id": emp['employee_id'],
                 "name": f"{emp['first_name']} {emp['last_name']}",
                 "position": emp['title'],
                 "department": emp['department']
             }
-            
-            if include_all_levels:
-                subordinates = build_hierarchy(emp['id'], dept_id if dept_id else None)
-                if subordinates:
-                    emp_dict["reports"] = subordinates
-            
-            org_structure.append(emp_dict)
+            nodes[emp['id']] = emp_dict
+            reports_by_manager.setdefault(emp['manager_id'], []).append(emp_dict)
         
-        return org_structure
-    
-    org_chart = build_hierarchy(None, department_id)
-    
-    # Get department info if specified
-    if department_id:
-        cursor.execute('SELECT name FROM departments WHERE id = ?', (department_id,))
-        dept = cursor.fetchone()
-        result = {
-            "department": dept['name'] if dept else "Unknown",
-            "structure": org_chart
-        }
-    else:
-        result = {"organization": org_chart}
-    
-    conn.close()
-    return result
+        for emp_id, emp_dict in nodes.items():
+            reports = reports_by_manager.get(emp_id)
+            if reports:
+                emp_dict["reports"] = reports
+        
+        org_chart = reports_by_manager.get(None, [])
+        
+        # Get department info if specified
+        if department_id:
+            cursor.execute('SELECT name FROM departments WHERE id = ?', (department_id,))
+            dept = cursor.fetchone()
+            result = {
+                "department": dept['name'] if dept else "Unknown",
+                "structure": org_chart
+            }
+        else:
+            result = {"organization": org_chart}
+        
+        return result
 
 @mcp.tool()
 def manage_department(
@@ -685,91 +962,102 @@ def manage_department(
     Returns:
         Operation result
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        if action == 'create':
-            if 'name' not in department_data:
-                return {"success": False, "error": "Department name required"}
-            
-            cursor.execute('''
-                INSERT INTO departments (name, parent_id, manager_id, budget, cost_center)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                department_data['name'],
-                department_data.get('parent_id'),
-                department_data.get('manager_id'),
-                department_data.get('budget'),
-                department_data.get('cost_center')
-            ))
-            
-            dept_id = cursor.lastrowid
-            conn.commit()
-            log_audit('CREATE', 'department', dept_id, None, department_data)
-            
-            return {"success": True, "department_id": dept_id, "message": "Department created successfully"}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
-        elif action == 'update':
-            if 'department_id' not in department_data:
-                return {"success": False, "error": "department_id required"}
-            
-            update_fields = []
-            values = []
-            for field in ['name', 'parent_id', 'manager_id', 'budget', 'cost_center']:
-                if field in department_data:
-                    update_fields.append(f"{field} = ?")
-                    values.append(department_data[field])
-            
-            if update_fields:
-                values.append(department_data['department_id'])
-                cursor.execute(f'''
-                    UPDATE departments 
-                    SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', values)
+        try:
+            if action == 'create':
+                if 'name' not in department_data:
+                    return {"success": False, "error": "Department name required"}
                 
+                # Insert and its audit entry commit together
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('''
+                    INSERT INTO departments (name, parent_id, manager_id, budget, cost_center)
+                    VALUES (?, ?, ?, ?, ?)
+                    RETURNING id
+                ''', (
+                    department_data['name'],
+                    department_data.get('parent_id'),
+                    department_data.get('manager_id'),
+                    department_data.get('budget'),
+                    department_data.get('cost_center')
+                ))
+                
+                dept_id = cursor.fetchone()[0]
+                log_audit('CREATE', 'department', dept_id, None, department_data, cursor=cursor)
                 conn.commit()
-                return {"success": True, "message": "Department updated successfully"}
-            
-            return {"success": False, "error": "No fields to update"}
-        
-        elif action == 'merge':
-            if 'source_id' not in department_data or 'target_id' not in department_data:
-                return {"success": False, "error": "source_id and target_id required"}
-            
-            # Move all employees from source to target department
-            cursor.execute('''
-                UPDATE employees 
-                SET department_id = ?
-                WHERE department_id = ?
-            ''', (department_data['target_id'], department_data['source_id']))
-            
-            # Update positions
-            cursor.execute('''
-                UPDATE positions 
-                SET department_id = ?
-                WHERE department_id = ?
-            ''', (department_data['target_id'], department_data['source_id']))
-            
-            # Delete source department
-            cursor.execute('DELETE FROM departments WHERE id = ?', (department_data['source_id'],))
+                
+                return {"success": True, "department_id": dept_id, "message": "Department created successfully"}
             
-            conn.commit()
-            log_audit('MERGE', 'department', department_data['source_id'], 
-                     {'source': department_data['source_id']}, 
-                     {'target': department_data['target_id']})
+            elif action == 'update':
+                if 'department_id' not in department_data:
+                    return {"success": False, "error": "department_id required"}
+                
+                update_fields = []
+                values = []
+                for field in ['name', 'parent_id', 'manager_id', 'budget', 'cost_center']:
+                    if field in department_data:
+                        update_fields.append(f"{field} = ?")
+                        values.append(department_data[field])
+                
+                if update_fields:
+                    values.append(department_data['department_id'])
+                    cursor.execute(f'''
+                        UPDATE departments 
+                        SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', values)
+                    
+                    conn.commit()
+                    _department_id.cache_clear()
+                    return {"success": True, "message": "Department updated successfully"}
+                
+                return {"success": False, "error": "No fields to update"}
             
-            return {"success": True, "message": "Departments merged successfully"}
-        
-        else:
-            return {"success": False, "error": f"Unknown action: {action}"}
+            elif action == 'merge':
+                if 'source_id' not in department_data or 'target_id' not in department_data:
+                    return {"success": False, "error": "source_id and target_id required"}
+                
+                if department_data['source_id'] == department_data['target_id']:
+                    return {"success": False, "error": "Cannot merge a department into itself"}
+                
+                merge = {'source': department_data['source_id'], 'target': department_data['target_id']}
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                # Check both departments exist before touching any data
+                cursor.execute('''
+                    SELECT EXISTS(SELECT 1 FROM departments WHERE id = :source),
+                           EXISTS(SELECT 1 FROM departments WHERE id = :target)
+                ''', merge)
+                source_exists, target_exists = cursor.fetchone()
+                if not source_exists:
+                    return {"success": False, "error": "Source department not found"}
+                if not target_exists:
+                    return {"success": False, "error": "Target department not found"}
+                
+                # Move all employees and positions from source to target department
+                cursor.execute('UPDATE employees SET department_id = :target WHERE department_id = :source', merge)
+                cursor.execute('UPDATE positions SET department_id = :target WHERE department_id = :source', merge)
+                
+                # Delete source department
+                cursor.execute('DELETE FROM departments WHERE id = :source', merge)
+                
+                log_audit('MERGE', 'department', department_data['source_id'], 
+                         {'source': department_data['source_id']}, 
+                         {'target': department_data['target_id']}, cursor=cursor)
+                conn.commit()
+                _department_id.cache_clear()
+                
+                return {"success": True, "message": "Departments merged successfully"}
             
-    except Exception as e:
-        conn.rollback()
-        return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
+            else:
+                return {"success": False, "error": f"Unknown action: {action}"}
+                
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "error": str(e)}
 
 # Leave Management Tools
 @mcp.tool()
@@ -793,59 +1081,79 @@ def request_leave(
     Returns:
         Request submission result
     """
-    conn = get_db_connection()
+    with get_db_connection() as conn:
+        return _request_leave(conn, employee_id, leave_type, start_date, end_date, reason)
+
+# Inserts the request only if the employee has enough balance for the year, and returns what is
+# left of it; no row back means the employee is unknown or the balance is missing or too low
+_REQUEST_LEAVE_SQL = '''
+    INSERT INTO leave_requests (
+        employee_id, leave_type_id, start_date, end_date,
+        days_requested, reason, status
+    )
+    SELECT lb.employee_id, lb.leave_type_id, :start_date, :end_date, :days_requested, :reason, 'pending'
+    FROM employees e
+    JOIN leave_balances lb ON lb.employee_id = e.id
+    WHERE e.employee_id = :employee_id
+    AND lb.leave_type_id = :leave_type_id AND lb.year = :year
+    AND lb.remaining_days >= :days_requested
+    RETURNING id, (
+        SELECT remaining_days FROM leave_balances
+        WHERE employee_id = leave_requests.employee_id
+        AND leave_type_id = leave_requests.leave_type_id AND year = :year
+    ) - days_requested
+'''
+
+def _request_leave(conn: sqlite3.Connection, employee_id: str, leave_type: str, start_date: str, end_date: str,
+                   reason: str) -> Dict[str, Any]:
+    """request_leave on the caller's connection"""
     cursor = conn.cursor()
     
     try:
-        # Get employee and leave type IDs
-        cursor.execute('SELECT id FROM employees WHERE employee_id = ?', (employee_id,))
-        emp = cursor.fetchone()
-        if not emp:
-            return {"success": False, "error": "Employee not found"}
+        # Balance check and insert in one write transaction
+        cursor.execute('BEGIN IMMEDIATE')
         
-        cursor.execute('SELECT id FROM leave_types WHERE name = ?', (leave_type,))
-        leave = cursor.fetchone()
-        if not leave:
+        # Get leave type ID
+        try:
+            leave_type_id = _leave_type_id(leave_type)
+        except KeyError:
             return {"success": False, "error": "Invalid leave type"}
         
         # Calculate days requested
         days_requested = calculate_leave_days(start_date, end_date)
         
-        # Check leave balance
-        year = datetime.strptime(start_date, '%Y-%m-%d').year
-        cursor.execute('''
-            SELECT remaining_days 
-            FROM leave_balances 
-            WHERE employee_id = ? AND leave_type_id = ? AND year = ?
-        ''', (emp['id'], leave['id'], year))
+        # Create leave request if the balance covers it
+        # calculate_leave_days has already validated the ISO date
+        cursor.execute(_REQUEST_LEAVE_SQL, {
+            'employee_id': employee_id,
+            'leave_type_id': leave_type_id,
+            'year': int(start_date[:4]),
+            'start_date': start_date,
+            'end_date': end_date,
+            'days_requested': days_requested,
+            'reason': reason,
+        })
         
-        balance = cursor.fetchone()
-        if not balance or balance['remaining_days'] < days_requested:
+        created = cursor.fetchone()
+        if created is None:
+            # Rare path: find out which condition failed
+            if _emp_pk(cursor, employee_id) is None:
+                return {"success": False, "error": "Employee not found"}
             return {"success": False, "error": "Insufficient leave balance"}
         
-        # Create leave request
-        cursor.execute('''
-            INSERT INTO leave_requests (
-                employee_id, leave_type_id, start_date, end_date,
-                days_requested, reason, status
-            ) VALUES (?, ?, ?, ?, ?, ?, 'pending')
-        ''', (emp['id'], leave['id'], start_date, end_date, days_requested, reason))
-        
-        request_id = cursor.lastrowid
+        request_id, remaining_balance = created
         conn.commit()
         
         return {
             "success": True,
             "request_id": request_id,
             "message": f"Leave request submitted for {days_requested} days",
-            "remaining_balance": balance['remaining_days'] - days_requested
+            "remaining_balance": remaining_balance
         }
         
     except Exception as e:
         conn.rollback()
         return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
 
 @mcp.tool()
 def approve_leave(
@@ -866,73 +1174,74 @@ def approve_leave(
     Returns:
         Approval result
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Get approver ID
-        cursor.execute('SELECT id FROM employees WHERE employee_id = ?', (approver_id,))
-        approver = cursor.fetchone()
-        if not approver:
-            return {"success": False, "error": "Approver not found"}
-        
-        # Get leave request details
-        cursor.execute('''
-            SELECT lr.*, e.first_name, e.last_name, lt.name as leave_type
-            FROM leave_requests lr
-            JOIN employees e ON lr.employee_id = e.id
-            JOIN leave_types lt ON lr.leave_type_id = lt.id
-            WHERE lr.id = ?
-        ''', (request_id,))
-        
-        request = cursor.fetchone()
-        if not request:
-            return {"success": False, "error": "Leave request not found"}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
-        if request['status'] != 'pending':
-            return {"success": False, "error": f"Request already {request['status']}"}
-        
-        if action == 'approve':
-            # Update request status
-            cursor.execute('''
-                UPDATE leave_requests 
-                SET status = 'approved', approved_by = ?, approved_date = CURRENT_TIMESTAMP,
-                    comments = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (approver['id'], comments, request_id))
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
             
-            # Update leave balance
-            year = datetime.strptime(request['start_date'], '%Y-%m-%d').year
+            # Get approver ID and leave request details together; always one row, so a
+            # missing approver or request shows up as NULL columns
             cursor.execute('''
-                UPDATE leave_balances 
-                SET used_days = used_days + ?,
-                    remaining_days = remaining_days - ?
-                WHERE employee_id = ? AND leave_type_id = ? AND year = ?
-            ''', (request['days_requested'], request['days_requested'], 
-                  request['employee_id'], request['leave_type_id'], year))
+                SELECT
+                    (SELECT id FROM employees WHERE employee_id = :approver_id) as approver_pk,
+                    lr.id, lr.status, e.first_name, e.last_name
+                FROM (SELECT 1)
+                LEFT JOIN leave_requests lr ON lr.id = :request_id
+                LEFT JOIN employees e ON lr.employee_id = e.id
+            ''', {'approver_id': approver_id, 'request_id': request_id})
             
-            message = f"Leave request approved for {request['first_name']} {request['last_name']}"
-        
-        else:  # reject
-            cursor.execute('''
-                UPDATE leave_requests 
-                SET status = 'rejected', approved_by = ?, approved_date = CURRENT_TIMESTAMP,
-                    comments = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (approver['id'], comments, request_id))
+            request = cursor.fetchone()
+            if request['approver_pk'] is None:
+                return {"success": False, "error": "Approver not found"}
             
-            message = f"Leave request rejected for {request['first_name']} {request['last_name']}"
-        
-        conn.commit()
-        log_audit(action.upper(), 'leave_request', request_id, None, {'comments': comments})
-        
-        return {"success": True, "message": message}
-        
-    except Exception as e:
-        conn.rollback()
-        return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
+            if request['id'] is None:
+                return {"success": False, "error": "Leave request not found"}
+            
+            if request['status'] != 'pending':
+                return {"success": False, "error": f"Request already {request['status']}"}
+            
+            if action == 'approve':
+                # Update request status
+                cursor.execute('''
+                    UPDATE leave_requests 
+                    SET status = 'approved', approved_by = ?, approved_date = CURRENT_TIMESTAMP,
+                        comments = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (request['approver_pk'], comments, request_id))
+                
+                # Update leave balance straight from the request row
+                cursor.execute('''
+                    UPDATE leave_balances 
+                    SET used_days = used_days + lr.days_requested,
+                        remaining_days = remaining_days - lr.days_requested
+                    FROM leave_requests lr
+                    WHERE lr.id = ?
+                    AND leave_balances.employee_id = lr.employee_id
+                    AND leave_balances.leave_type_id = lr.leave_type_id
+                    AND leave_balances.year = CAST(substr(lr.start_date, 1, 4) AS INTEGER)
+                ''', (request_id,))
+                
+                message = f"Leave request approved for {request['first_name']} {request['last_name']}"
+            
+            else:  # reject
+                cursor.execute('''
+                    UPDATE leave_requests 
+                    SET status = 'rejected', approved_by = ?, approved_date = CURRENT_TIMESTAMP,
+                        comments = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (request['approver_pk'], comments, request_id))
+                
+                message = f"Leave request rejected for {request['first_name']} {request['last_name']}"
+            
+            log_audit(action.upper(), 'leave_request', request_id, None, {'comments': comments}, cursor=cursor)
+            conn.commit()
+            
+            return {"success": True, "message": message}
+            
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "error": str(e)}
 
 @mcp.tool()
 def get_leave_balance(
@@ -949,18 +1258,22 @@ def get_leave_balance(
     Returns:
         Leave balance details
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Get employee
+        cursor.execute('SELECT id, first_name, last_name FROM employees WHERE employee_id = ?', (employee_id,))
+        emp = cursor.fetchone()
+        if not emp:
+            return {"success": False, "error": "Employee not found"}
+        
+        return _get_leave_balance(cursor, emp, year)
+
+def _get_leave_balance(cursor: sqlite3.Cursor, emp: sqlite3.Row, year: Optional[int]) -> Dict[str, Any]:
+    """get_leave_balance for an employee row with id, first_name and last_name"""
     if not year:
         year = datetime.now().year
     
-    # Get employee
-    cursor.execute('SELECT id, first_name, last_name FROM employees WHERE employee_id = ?', (employee_id,))
-    emp = cursor.fetchone()
-    if not emp:
-        return {"success": False, "error": "Employee not found"}
-    
     # Get leave balances
     cursor.execute('''
         SELECT 
@@ -973,10 +1286,7 @@ def get_leave_balance(
         JOIN leave_types lt ON lb.leave_type_id = lt.id
         WHERE lb.employee_id = ? AND lb.year = ?
     ''', (emp['id'], year))
-    
-    balances = []
-    for row in cursor.fetchall():
-        balances.append(dict(row))
+    balances = _rows_as_dicts(cursor)
     
     # Get pending requests
     cursor.execute('''
@@ -988,14 +1298,10 @@ def get_leave_balance(
         FROM leave_requests lr
         JOIN leave_types lt ON lr.leave_type_id = lt.id
         WHERE lr.employee_id = ? AND lr.status = 'pending'
-        AND strftime('%Y', lr.start_date) = ?
-    ''', (emp['id'], str(year)))
+        AND lr.start_date >= ? AND lr.start_date < ?
+    ''', (emp['id'], f"{year}-01-01", f"{year + 1}-01-01"))
+    pending = _rows_as_dicts(cursor)
     
-    pending = []
-    for row in cursor.fetchall():
-        pending.append(dict(row))
-    
-    conn.close()
     
     return {
         "employee": f"{emp['first_name']} {emp['last_name']}",
@@ -1026,32 +1332,37 @@ def update_salary(
     Returns:
         Update result
     """
-    conn = get_db_connection()
+    with get_db_connection() as conn:
+        emp_pk = _emp_pk(conn.cursor(), employee_id)
+        if emp_pk is None:
+            return {"success": False, "error": "Employee not found"}
+        
+        return _update_salary(conn, emp_pk, new_salary, effective_date, bonus, reason)
+
+def _update_salary(conn: sqlite3.Connection, emp_pk: int, new_salary: float, effective_date: str,
+                   bonus: Optional[float], reason: str) -> Dict[str, Any]:
+    """update_salary for an already resolved employees.id, on the caller's connection"""
     cursor = conn.cursor()
     
     try:
-        # Get employee
-        cursor.execute('SELECT id FROM employees WHERE employee_id = ?', (employee_id,))
-        emp = cursor.fetchone()
-        if not emp:
-            return {"success": False, "error": "Employee not found"}
+        cursor.execute('BEGIN IMMEDIATE')
         
         # End current salary record
         cursor.execute('''
             UPDATE salaries 
             SET end_date = date(?, '-1 day')
             WHERE employee_id = ? AND end_date IS NULL
-        ''', (effective_date, emp['id']))
+        ''', (effective_date, emp_pk))
         
         # Insert new salary record
         cursor.execute('''
             INSERT INTO salaries (employee_id, base_salary, bonus, effective_date)
             VALUES (?, ?, ?, ?)
-        ''', (emp['id'], new_salary, bonus, effective_date))
+        ''', (emp_pk, new_salary, bonus, effective_date))
         
+        log_audit('SALARY_UPDATE', 'employee', emp_pk, None, 
+                 {'new_salary': new_salary, 'reason': reason}, cursor=cursor)
         conn.commit()
-        log_audit('SALARY_UPDATE', 'employee', emp['id'], None, 
-                 {'new_salary': new_salary, 'reason': reason})
         
         return {
             "success": True,
@@ -1061,8 +1372,47 @@ def update_salary(
     except Exception as e:
         conn.rollback()
         return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
+
+# generate_compensation_report salary statistics for each (department filter, position filter)
+# shape, built once at import so each shape is always the same statement text
+_COMPENSATION_SQL = f'''
+    SELECT 
+        d.name as department,
+        p.title as position,
+        COUNT(DISTINCT e.id) as employee_count,
+        AVG(s.base_salary) as avg_salary,
+        MIN(s.base_salary) as min_salary,
+        MAX(s.base_salary) as max_salary,
+        SUM(s.base_salary) as total_payroll,
+        AVG(s.bonus) as avg_bonus,
+        -- Report totals across all groups, carried on every row
+        SUM(SUM(s.base_salary)) OVER () as grand_total_payroll,
+        SUM(COUNT(DISTINCT e.id)) OVER () as grand_employee_count
+    FROM employees e
+    JOIN salaries s ON e.id = s.employee_id
+    LEFT JOIN departments d ON e.department_id = d.id
+    LEFT JOIN positions p ON e.position_id = p.id
+    WHERE e.employment_status = {_ACTIVE}
+    AND s.end_date IS NULL
+    {{department}}
+    {{position}}
+    GROUP BY d.name, p.title
+'''
+_COMPENSATION_QUERIES = {
+    (has_department, has_position): _COMPENSATION_SQL.format(
+        department="AND e.department_id = ?" if has_department else "",
+        position="AND p.title LIKE ?" if has_position else "",
+    )
+    for has_department in (False, True)
+    for has_position in (False, True)
+}
+
+# Read-only reports are reused until data changes or _REPORT_CACHE_SECONDS pass
+_REPORT_CACHE_SECONDS = 30
+
+def _report_cache_key() -> tuple:
+    # The time bucket also expires reports when another process writes to the database file
+    return (_DATA_VERSION, int(time.monotonic() // _REPORT_CACHE_SECONDS))
 
 @mcp.tool()
 def generate_compensation_report(
@@ -1080,91 +1430,144 @@ def generate_compensation_report(
     Returns:
         Compensation analysis report
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Base query for salary statistics
-    query = '''
-        SELECT 
-            d.name as department,
-            p.title as position,
-            COUNT(DISTINCT e.id) as employee_count,
-            AVG(s.base_salary) as avg_salary,
-            MIN(s.base_salary) as min_salary,
-            MAX(s.base_salary) as max_salary,
-            SUM(s.base_salary) as total_payroll,
-            AVG(s.bonus) as avg_bonus
-        FROM employees e
-        JOIN salaries s ON e.id = s.employee_id
-        LEFT JOIN departments d ON e.department_id = d.id
-        LEFT JOIN positions p ON e.position_id = p.id
-        WHERE e.employment_status = 'active'
-        AND s.end_date IS NULL
-    '''
-    
-    params = []
-    
-    if filters.get('department'):
-        if isinstance(filters['department'], int):
-            query += " AND e.department_id = ?"
-            params.append(filters['department'])
-        else:
-            query += " AND d.name = ?"
-            params.append(filters['department'])
-    
-    if filters.get('position'):
-        query += " AND p.title LIKE ?"
-        params.append(f"%{filters['position']}%")
-    
-    # Group by department and position
-    query += " GROUP BY d.name, p.title"
-    
-    cursor.execute(query, params)
-    
-    report_data = []
-    total_payroll = 0
-    total_employees = 0
-    
-    for row in cursor.fetchall():
-        report_data.append(dict(row))
-        total_payroll += row['total_payroll'] or 0
-        total_employees += row['employee_count']
-    
-    # Get salary distribution
-    cursor.execute('''
-        SELECT 
-            CASE 
-                WHEN base_salary < 50000 THEN 'Under 50k'
-                WHEN base_salary < 75000 THEN '50k-75k'
-                WHEN base_salary < 100000 THEN '75k-100k'
-                WHEN base_salary < 150000 THEN '100k-150k'
-                ELSE 'Over 150k'
-            END as salary_range,
-            COUNT(*) as count
-        FROM salaries s
-        JOIN employees e ON s.employee_id = e.id
-        WHERE e.employment_status = 'active' AND s.end_date IS NULL
-        GROUP BY salary_range
-    ''')
-    
-    salary_distribution = []
-    for row in cursor.fetchall():
-        salary_distribution.append(dict(row))
-    
-    conn.close()
-    
-    return {
-        "summary": {
-            "total_employees": total_employees,
-            "total_payroll": total_payroll,
-            "average_salary": total_payroll / total_employees if total_employees > 0 else 0
-        },
-        "by_department_position": report_data,
-        "salary_distribution": salary_distribution,
-        "generated_at": datetime.now().isoformat()
-    }
+    try:
+        report = _cached_compensation_report(frozenset(filters.items()), _report_cache_key())
+    except TypeError:  # unhashable filter value
+        return _generate_compensation_report(filters)
+    # Copied so a caller can't modify the cached report
+    return copy.deepcopy(report)
+
+@lru_cache(maxsize=64)
+def _cached_compensation_report(filter_items: frozenset, cache_key: tuple) -> Dict[str, Any]:
+    return _generate_compensation_report(dict(filter_items))
+
+def _generate_compensation_report(filters: Dict[str, Any]) -> Dict[str, Any]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        params = []
+        
+        if filters.get('department'):
+            if isinstance(filters['department'], int):
+                department_id = filters['department']
+            else:
+                try:
+                    department_id = _department_id(filters['department'])
+                except KeyError:
+                    department_id = None  # unknown name: matches no rows, as the name filter did
+            params.append(department_id)
+        
+        if filters.get('position'):
+            params.append(f"%{filters['position']}%")
+        
+        query = _COMPENSATION_QUERIES[bool(filters.get('department')), bool(filters.get('position'))]
+        cursor.execute(query, params)
+        
+        # Plain tuples; the two trailing total columns are left out of each group's dict
+        cursor.row_factory = None
+        columns = [col[0] for col in cursor.description][:-2]
+        rows = cursor.fetchall()
+        report_data = [dict(zip(columns, row)) for row in rows]
+        total_payroll = (rows[0][-2] or 0) if rows else 0
+        total_employees = rows[0][-1] if rows else 0
+        
+        # Get salary distribution, built as one JSON array by SQLite
+        cursor.execute(f'''
+            SELECT json_group_array(json_object('salary_range', salary_range, 'count', count))
+            FROM (
+                SELECT s.salary_bucket as salary_range, COUNT(*) as count
+                FROM salaries s
+                JOIN employees e ON s.employee_id = e.id
+                WHERE e.employment_status = {_ACTIVE} AND s.end_date IS NULL
+                GROUP BY s.salary_bucket
+            )
+        ''')
+        salary_distribution = json.loads(cursor.fetchone()[0])
+        
+        
+        return {
+            "summary": {
+                "total_employees": total_employees,
+                "total_payroll": total_payroll,
+                "average_salary": total_payroll / total_employees if total_employees > 0 else 0
+            },
+            "by_department_position": report_data,
+            "salary_distribution": salary_distribution,
+            "generated_at": datetime.now().isoformat()
+        }
 
 # Analytics & Reporting Tools
+# generate_hr_dashboard sections; json() keeps each subquery's JSON from being re-quoted as text
+_DASHBOARD_SQL = f'''
+    SELECT json_object(
+        -- Employee statistics
+        'employee_statistics', json((
+            SELECT json_object(
+                'total', COUNT(*),
+                'active', SUM(CASE WHEN employment_status = {_ACTIVE} THEN 1 ELSE 0 END),
+                'terminated', SUM(CASE WHEN employment_status = {_TERMINATED} THEN 1 ELSE 0 END),
+                'full_time', SUM(CASE WHEN employment_type = 'full-time' THEN 1 ELSE 0 END),
+                'part_time', SUM(CASE WHEN employment_type = 'part-time' THEN 1 ELSE 0 END),
+                'contractors', SUM(CASE WHEN employment_type = 'contractor' THEN 1 ELSE 0 END)
+            )
+            FROM employees
+        )),
+        -- Department distribution
+        'department_distribution', json((
+            SELECT json_group_array(json_object('name', name, 'count', count))
+            FROM (
+                SELECT d.name, COUNT(e.id) as count
+                FROM departments d
+                LEFT JOIN employees e ON d.id = e.department_id AND e.employment_status = {_ACTIVE}
+                GROUP BY d.name
+            )
+        )),
+        -- Recent hires (last 90 days)
+        'new_hires', (
+            SELECT COUNT(*)
+            FROM employees
+            WHERE hire_date >= :new_hire_cutoff
+        ),
+        -- Upcoming reviews: active employees never reviewed, or with a review due by the cutoff
+        'pending_reviews', (
+            SELECT COUNT(*)
+            FROM employees e
+            WHERE e.employment_status = {_ACTIVE}
+            AND (
+                NOT EXISTS (SELECT 1 FROM performance_reviews pr WHERE pr.employee_id = e.id)
+                OR EXISTS (
+                    SELECT 1 FROM performance_reviews pr
+                    WHERE pr.employee_id = e.id AND pr.next_review_date <= :review_cutoff
+                )
+            )
+        ),
+        -- Leave metrics
+        'leave_metrics', json((
+            SELECT json_object(
+                'pending_leaves', COUNT(CASE WHEN status = 'pending' THEN 1 END),
+                'upcoming_leaves', COUNT(CASE WHEN status = 'approved' AND start_date >= :today THEN 1 END)
+            )
+            FROM leave_requests
+        )),
+        -- Gender diversity
+        'gender_diversity', json((
+            SELECT json_group_array(json_object('gender', gender, 'count', count))
+            FROM (
+                SELECT gender, COUNT(*) as count
+                FROM employees
+                WHERE employment_status = {_ACTIVE} AND gender IS NOT NULL
+                GROUP BY gender
+            )
+        )),
+        -- Average tenure
+        'avg_tenure_years', (
+            SELECT AVG(julianday(:now) - julianday(hire_date)) / 365
+            FROM employees
+            WHERE employment_status = {_ACTIVE}
+        )
+    )
+'''
+
 @mcp.tool()
 def generate_hr_dashboard() -> Dict[str, Any]:
     """
@@ -1173,96 +1576,52 @@ def generate_hr_dashboard() -> Dict[str, Any]:
     Returns:
         Dashboard with key HR metrics
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Employee statistics
-    cursor.execute('''
-        SELECT 
-            COUNT(*) as total,
-            SUM(CASE WHEN employment_status = 'active' THEN 1 ELSE 0 END) as active,
-            SUM(CASE WHEN employment_status = 'terminated' THEN 1 ELSE 0 END) as terminated,
-            SUM(CASE WHEN employment_type = 'full-time' THEN 1 ELSE 0 END) as full_time,
-            SUM(CASE WHEN employment_type = 'part-time' THEN 1 ELSE 0 END) as part_time,
-            SUM(CASE WHEN employment_type = 'contractor' THEN 1 ELSE 0 END) as contractors
-        FROM employees
-    ''')
-    employee_stats = dict(cursor.fetchone())
-    
-    # Department distribution
-    cursor.execute('''
-        SELECT d.name, COUNT(e.id) as count
-        FROM departments d
-        LEFT JOIN employees e ON d.id = e.department_id AND e.employment_status = 'active'
-        GROUP BY d.name
-    ''')
-    dept_distribution = []
-    for row in cursor.fetchall():
-        dept_distribution.append(dict(row))
-    
-    # Recent hires (last 90 days)
-    cursor.execute('''
-        SELECT COUNT(*) as new_hires
-        FROM employees
-        WHERE hire_date >= date('now', '-90 days')
-    ''')
-    new_hires = cursor.fetchone()['new_hires']
-    
-    # Upcoming reviews
-    cursor.execute('''
-        SELECT COUNT(DISTINCT e.id) as pending_reviews
-        FROM employees e
-        LEFT JOIN performance_reviews pr ON e.id = pr.employee_id
-        WHERE e.employment_status = 'active'
-        AND (pr.id IS NULL OR pr.next_review_date <= date('now', '+30 days'))
-    ''')
-    pending_reviews = cursor.fetchone()['pending_reviews']
-    
-    # Leave metrics
-    cursor.execute('''
-        SELECT 
-            COUNT(CASE WHEN status = 'pending' THEN 1 END) as pending_leaves,
-            COUNT(CASE WHEN status = 'approved' AND start_date >= date('now') THEN 1 END) as upcoming_leaves
-        FROM leave_requests
-    ''')
-    leave_metrics = dict(cursor.fetchone())
-    
-    # Gender diversity
-    cursor.execute('''
-        SELECT gender, COUNT(*) as count
-        FROM employees
-        WHERE employment_status = 'active' AND gender IS NOT NULL
-        GROUP BY gender
-    ''')
-    gender_diversity = []
-    for row in cursor.fetchall():
-        gender_diversity.append(dict(row))
-    
-    # Average tenure
-    cursor.execute('''
-        SELECT AVG(julianday('now') - julianday(hire_date)) / 365 as avg_tenure_years
-        FROM employees
-        WHERE employment_status = 'active'
-    ''')
-    avg_tenure = cursor.fetchone()['avg_tenure_years']
-    
-    conn.close()
-    
-    return {
-        "employee_statistics": employee_stats,
-        "department_distribution": dept_distribution,
-        "recent_activity": {
-            "new_hires_90_days": new_hires,
-            "pending_performance_reviews": pending_reviews,
-            "pending_leave_requests": leave_metrics['pending_leaves'],
-            "upcoming_leaves": leave_metrics['upcoming_leaves']
-        },
-        "diversity_metrics": {
-            "gender_distribution": gender_diversity,
-            "average_tenure_years": round(avg_tenure, 1) if avg_tenure else 0
-        },
-        "generated_at": datetime.now().isoformat()
-    }
+    # Copied so a caller can't modify the cached dashboard
+    return copy.deepcopy(_cached_hr_dashboard(_report_cache_key()))
+
+@lru_cache(maxsize=1)
+def _cached_hr_dashboard(cache_key: tuple) -> Dict[str, Any]:
+    return _generate_hr_dashboard()
+
+def _generate_hr_dashboard() -> Dict[str, Any]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # All dashboard sections in one statement, returned as a single JSON object
+        # Cutoffs are computed once here and bound, on the same calendar as
+        # SQLite's 'now' (UTC)
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        cursor.execute(_DASHBOARD_SQL, {
+            'now': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'today': today.isoformat(),
+            'new_hire_cutoff': (today - timedelta(days=90)).isoformat(),
+            'review_cutoff': (today + timedelta(days=30)).isoformat(),
+        })
+        dashboard = json.loads(cursor.fetchone()[0])
+        employee_stats = dashboard['employee_statistics']
+        dept_distribution = dashboard['department_distribution']
+        new_hires = dashboard['new_hires']
+        pending_reviews = dashboard['pending_reviews']
+        leave_metrics = dashboard['leave_metrics']
+        gender_diversity = dashboard['gender_diversity']
+        avg_tenure = dashboard['avg_tenure_years']
+        
+        return {
+            "employee_statistics": employee_stats,
+            "department_distribution": dept_distribution,
+            "recent_activity": {
+                "new_hires_90_days": new_hires,
+                "pending_performance_reviews": pending_reviews,
+                "pending_leave_requests": leave_metrics['pending_leaves'],
+                "upcoming_leaves": leave_metrics['upcoming_leaves']
+            },
+            "diversity_metrics": {
+                "gender_distribution": gender_diversity,
+                "average_tenure_years": round(avg_tenure, 1) if avg_tenure else 0
+            },
+            "generated_at": datetime.now().isoformat()
+        }
 
 @mcp.tool()
 def analyze_turnover(
@@ -1279,96 +1638,92 @@ def analyze_turnover(
     Returns:
         Turnover analysis report
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Calculate date range
-    if period == "month":
-        date_from = date.today() - timedelta(days=30)
-    elif period == "quarter":
-        date_from = date.today() - timedelta(days=90)
-    else:  # year
-        date_from = date.today() - timedelta(days=365)
-    
-    # Base query
-    base_where = " WHERE 1=1"
-    params = []
-    
-    if department_id:
-        base_where += " AND department_id = ?"
-        params.append(department_id)
-    
-    # Get termination data
-    cursor.execute(f'''
-        SELECT 
-            COUNT(*) as terminations,
-            strftime('%Y-%m', updated_at) as month
-        FROM employees
-        {base_where}
-        AND employment_status = 'terminated'
-        AND updated_at >= ?
-        GROUP BY month
-    ''', params + [date_from.isoformat()])
-    
-    monthly_terminations = {}
-    total_terminations = 0
-    for row in cursor.fetchall():
-        monthly_terminations[row['month']] = row['terminations']
-        total_terminations += row['terminations']
-    
-    # Get average headcount
-    cursor.execute(f'''
-        SELECT COUNT(*) as active_count
-        FROM employees
-        {base_where}
-        AND employment_status = 'active'
-    ''', params)
-    current_headcount = cursor.fetchone()['active_count']
-    
-    # Calculate turnover rate
-    avg_headcount = current_headcount + (total_terminations / 2)  # Simple average
-    if period == "month":
-        periods = 1
-    elif period == "quarter":
-        periods = 3
-    else:  # year
-        periods = 12
-    
-    annual_turnover_rate = (total_terminations / avg_headcount / periods * 12 * 100) if avg_headcount > 0 else 0
-    
-    # Get reasons if tracked (would need additional field in real implementation)
-    # For now, we'll analyze by department
-    cursor.execute('''
-        SELECT 
-            d.name as department,
-            COUNT(e.id) as terminations
-        FROM employees e
-        LEFT JOIN departments d ON e.department_id = d.id
-        WHERE e.employment_status = 'terminated'
-        AND e.updated_at >= ?
-        GROUP BY d.name
-    ''', [date_from.isoformat()])
-    
-    by_department = []
-    for row in cursor.fetchall():
-        by_department.append(dict(row))
-    
-    conn.close()
-    
-    return {
-        "period": period,
-        "date_range": {
-            "from": date_from.isoformat(),
-            "to": date.today().isoformat()
-        },
-        "summary": {
-            "total_terminations": total_terminations,
-            "current_headcount": current_headcount,
-            "annual_turnover_rate": round(annual_turnover_rate, 1)
-        },
-        "monthly_trend": monthly_terminations,
-        "by_department": by_department
-    }
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Calculate date range
+        if period == "month":
+            date_from = date.today() - timedelta(days=30)
+        elif period == "quarter":
+            date_from = date.today() - timedelta(days=90)
+        else:  # year
+            date_from = date.today() - timedelta(days=365)
+        
+        # Department filter for the monthly trend and headcount; the department
+        # breakdown always covers every department
+        dept_filter = " AND department_id = :department_id" if department_id else ""
+        
+        # Terminations in the period are read once and shared by every section
+        cursor.execute(f'''
+            WITH terms AS (
+                SELECT department_id, strftime('%Y-%m', updated_at) as month
+                FROM employees
+                WHERE employment_status = {_TERMINATED}
+                AND updated_at >= :date_from
+            )
+            SELECT 
+                -- {{month: terminations}}
+                (
+                    SELECT json_group_object(month, terminations)
+                    FROM (
+                        SELECT month, COUNT(*) as terminations
+                        FROM terms
+                        WHERE 1=1{dept_filter}
+                        GROUP BY month
+                    )
+                ) as monthly,
+                (SELECT COUNT(*) FROM terms WHERE 1=1{dept_filter}) as total,
+                -- Current headcount
+                (
+                    SELECT COUNT(*)
+                    FROM employees
+                    WHERE employment_status = {_ACTIVE}{dept_filter}
+                ) as active_count,
+                -- Get reasons if tracked (would need additional field in real implementation)
+                -- For now, we'll analyze by department
+                (
+                    SELECT json_group_array(json_object('department', department, 'terminations', terminations))
+                    FROM (
+                        SELECT d.name as department, COUNT(*) as terminations
+                        FROM terms t
+                        LEFT JOIN departments d ON t.department_id = d.id
+                        GROUP BY d.name
+                    )
+                ) as by_department
+        ''', {'date_from': date_from.isoformat(), 'department_id': department_id})
+        
+        row = cursor.fetchone()
+        monthly_terminations = json.loads(row['monthly'])
+        total_terminations = row['total']
+        current_headcount = row['active_count']
+        by_department = json.loads(row['by_department'])
+        
+        # Calculate turnover rate
+        avg_headcount = current_headcount + (total_terminations / 2)  # Simple average
+        if period == "month":
+            periods = 1
+        elif period == "quarter":
+            periods = 3
+        else:  # year
+            periods = 12
+        
+        annual_turnover_rate = (total_terminations / avg_headcount / periods * 12 * 100) if avg_headcount > 0 else 0
+        
+        
+        return {
+            "period": period,
+            "date_range": {
+                "from": date_from.isoformat(),
+                "to": date.today().isoformat()
+            },
+            "summary": {
+                "total_terminations": total_terminations,
+                "current_headcount": current_headcount,
+                "annual_turnover_rate": round(annual_turnover_rate, 1)
+            },
+            "monthly_trend": monthly_terminations,
+            "by_department": by_department
+        }
 
 # Performance Management Tools
 @mcp.tool()
@@ -1390,42 +1745,39 @@ def create_performance_review(
     Returns:
         Review creation result
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Get employee and reviewer IDs
-        cursor.execute('SELECT id FROM employees WHERE employee_id = ?', (employee_id,))
-        emp = cursor.fetchone()
-        if not emp:
-            return {"success": False, "error": "Employee not found"}
-        
-        cursor.execute('SELECT id FROM employees WHERE employee_id = ?', (reviewer_id,))
-        reviewer = cursor.fetchone()
-        if not reviewer:
-            return {"success": False, "error": "Reviewer not found"}
-        
-        # Create review
-        cursor.execute('''
-            INSERT INTO performance_reviews (
-                employee_id, reviewer_id, review_period_start, review_period_end
-            ) VALUES (?, ?, ?, ?)
-        ''', (emp['id'], reviewer['id'], period_start, period_end))
-        
-        review_id = cursor.lastrowid
-        conn.commit()
-        
-        return {
-            "success": True,
-            "review_id": review_id,
-            "message": "Performance review initiated"
-        }
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
-    except Exception as e:
-        conn.rollback()
-        return {"success": False, "error": str(e)}
-    finally:
-        conn.close()
+        try:
+            # Get employee and reviewer IDs
+            emp_pk = _emp_pk(cursor, employee_id)
+            if emp_pk is None:
+                return {"success": False, "error": "Employee not found"}
+            
+            reviewer_pk = _emp_pk(cursor, reviewer_id)
+            if reviewer_pk is None:
+                return {"success": False, "error": "Reviewer not found"}
+            
+            # Create review
+            cursor.execute('''
+                INSERT INTO performance_reviews (
+                    employee_id, reviewer_id, review_period_start, review_period_end
+                ) VALUES (?, ?, ?, ?)
+                RETURNING id
+            ''', (emp_pk, reviewer_pk, period_start, period_end))
+            
+            review_id = cursor.fetchone()[0]
+            conn.commit()
+            
+            return {
+                "success": True,
+                "review_id": review_id,
+                "message": "Performance review initiated"
+            }
+            
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "error": str(e)}
 
 # Simple wrapper tools for better LLM understanding
 @mcp.tool()
@@ -1496,6 +1848,33 @@ def find_employees_by_department(department: str) -> List[Dict[str, Any]]:
     """
     return search_employees({'department': department})
 
+def _resolve_employee_by_name(cursor: sqlite3.Cursor, employee_name: str):
+    """
+    Find the single employee with this full name (case-insensitive) for the name-based tools.
+
+    Returns (employee row, None) on a unique match, or (None, error result) when the
+    name is incomplete, unknown or shared by several employees.
+    """
+    name_parts = employee_name.strip().split(' ', 1)
+    if len(name_parts) < 2:
+        return None, {"success": False, "error": "Please provide both first and last name"}
+    
+    cursor.execute(_EMPLOYEE_BY_NAME_SQL, (name_parts[0], name_parts[1]))
+    matching_employees = cursor.fetchall()
+    
+    if not matching_employees:
+        return None, {"success": False, "error": f"Employee '{employee_name}' not found"}
+    
+    if len(matching_employees) > 1:
+        return None, {
+            "success": False, 
+            "error": f"Multiple employees found with name '{employee_name}'. Please use employee ID.",
+            "employees": [{"id": emp['employee_id'], "name": f"{emp['first_name']} {emp['last_name']}", 
+                          "department": emp['department_name']} for emp in matching_employees]
+        }
+    
+    return matching_employees[0], None
+
 @mcp.tool()
 def check_employee_leave_balance(
     employee_name: str,
@@ -1515,38 +1894,13 @@ def check_employee_leave_balance(
         check_employee_leave_balance("Sarah Johnson")
         check_employee_leave_balance("John Doe", 2024)
     """
-    # Search for employee by name
-    name_parts = employee_name.strip().split(' ', 1)
-    if len(name_parts) < 2:
-        return {"success": False, "error": "Please provide both first and last name"}
-    
-    first_name = name_parts[0]
-    last_name = name_parts[1]
-    
-    # Search for the employee
-    employees = search_employees({'name': first_name})
-    
-    # Filter by exact name match
-    matching_employees = [
-        emp for emp in employees 
-        if emp['first_name'].lower() == first_name.lower() 
-        and emp['last_name'].lower() == last_name.lower()
-    ]
-    
-    if not matching_employees:
-        return {"success": False, "error": f"Employee '{employee_name}' not found"}
-    
-    if len(matching_employees) > 1:
-        return {
-            "success": False, 
-            "error": f"Multiple employees found with name '{employee_name}'. Please use employee ID.",
-            "employees": [{"id": emp['employee_id'], "name": f"{emp['first_name']} {emp['last_name']}", 
-                          "department": emp.get('department_name', 'N/A')} for emp in matching_employees]
-        }
-    
-    # Get leave balance using employee_id
-    employee = matching_employees[0]
-    return get_leave_balance(employee['employee_id'], year)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        employee, error = _resolve_employee_by_name(cursor, employee_name)
+        if error:
+            return error
+        
+        return _get_leave_balance(cursor, employee, year)
 
 @mcp.tool()
 def update_employee_salary(
@@ -1572,38 +1926,12 @@ def update_employee_salary(
     Example:
         update_employee_salary("John Doe", 95000, "2024-01-01", reason="Annual raise")
     """
-    # Search for employee by name
-    name_parts = employee_name.strip().split(' ', 1)
-    if len(name_parts) < 2:
-        return {"success": False, "error": "Please provide both first and last name"}
-    
-    first_name = name_parts[0]
-    last_name = name_parts[1]
-    
-    # Search for the employee
-    employees = search_employees({'name': first_name})
-    
-    # Filter by exact name match
-    matching_employees = [
-        emp for emp in employees 
-        if emp['first_name'].lower() == first_name.lower() 
-        and emp['last_name'].lower() == last_name.lower()
-    ]
-    
-    if not matching_employees:
-        return {"success": False, "error": f"Employee '{employee_name}' not found"}
-    
-    if len(matching_employees) > 1:
-        return {
-            "success": False, 
-            "error": f"Multiple employees found with name '{employee_name}'. Please use employee ID.",
-            "employees": [{"id": emp['employee_id'], "name": f"{emp['first_name']} {emp['last_name']}", 
-                          "department": emp.get('department_name', 'N/A')} for emp in matching_employees]
-        }
-    
-    # Update salary using employee_id
-    employee = matching_employees[0]
-    return update_salary(employee['employee_id'], new_salary, effective_date, bonus, reason)
+    with get_db_connection() as conn:
+        employee, error = _resolve_employee_by_name(conn.cursor(), employee_name)
+        if error:
+            return error
+        
+        return _update_salary(conn, employee['id'], new_salary, effective_date, bonus, reason)
 
 @mcp.tool()
 def submit_leave_request(
@@ -1629,38 +1957,12 @@ def submit_leave_request(
     Example:
         submit_leave_request("Sarah Johnson", "Annual Leave", "2024-12-20", "2024-12-27", "Holiday vacation")
     """
-    # Search for employee by name
-    name_parts = employee_name.strip().split(' ', 1)
-    if len(name_parts) < 2:
-        return {"success": False, "error": "Please provide both first and last name"}
-    
-    first_name = name_parts[0]
-    last_name = name_parts[1]
-    
-    # Search for the employee
-    employees = search_employees({'name': first_name})
-    
-    # Filter by exact name match
-    matching_employees = [
-        emp for emp in employees 
-        if emp['first_name'].lower() == first_name.lower() 
-        and emp['last_name'].lower() == last_name.lower()
-    ]
-    
-    if not matching_employees:
-        return {"success": False, "error": f"Employee '{employee_name}' not found"}
-    
-    if len(matching_employees) > 1:
-        return {
-            "success": False, 
-            "error": f"Multiple employees found with name '{employee_name}'. Please use employee ID.",
-            "employees": [{"id": emp['employee_id'], "name": f"{emp['first_name']} {emp['last_name']}", 
-                          "department": emp.get('department_name', 'N/A')} for emp in matching_employees]
-        }
-    
-    # Submit leave request using employee_id
-    employee = matching_employees[0]
-    return request_leave(employee['employee_id'], leave_type, start_date, end_date, reason)
+    with get_db_connection() as conn:
+        employee, error = _resolve_employee_by_name(conn.cursor(), employee_name)
+        if error:
+            return error
+        
+        return _request_leave(conn, employee['employee_id'], leave_type, start_date, end_date, reason)
 
 # Initialize database when module loads
 init_db()
@@ -1673,6 +1975,11 @@ if __name__ == "__main__":
     parser.add_argument(
         "--server_type", type=str, default="sse", choices=["sse", "stdio"]
     )
+    parser.add_argument(
+        "--pool_size", type=int, default=DEFAULT_POOL_SIZE,
+        help="Number of idle SQLite connections kept open between tool calls"
+    )
     
     args = parser.parse_args()
+    configure_pool(args.pool_size)
     mcp.run(args.server_type)
\ No newline at end of file
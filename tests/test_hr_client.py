@@ -0,0 +1,117 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hr_client  # noqa: E402
+from llama_index.core.agent.workflow import FunctionAgent, ToolCallResult  # noqa: E402
+from llama_index.core.llms import MockLLM  # noqa: E402
+from llama_index.core.tools import ToolOutput  # noqa: E402
+from llama_index.core.workflow import Context  # noqa: E402
+from mcp.types import CallToolResult, TextContent  # noqa: E402
+
+
+class _HitCache:
+    """Semantic cache stand-in that answers every lookup"""
+
+    generation = 0
+
+    def __init__(self, response):
+        self.response = response
+
+    async def embed(self, query):
+        return np.ones(4, dtype=np.float32) / 2
+
+    def lookup(self, vector, intent, signature):
+        return self.response
+
+
+class SemanticCacheMemoryTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._semantic_cache = hr_client.semantic_cache
+        hr_client.semantic_cache = _HitCache("Total Employees: 3")
+        self.agent = FunctionAgent(name="HRAgent", tools=[], llm=MockLLM(), system_prompt="test")
+
+    def tearDown(self):
+        hr_client.semantic_cache = self._semantic_cache
+
+    async def _ask(self, ctx, message):
+        return "".join([chunk async for chunk in hr_client.handle_user_message(message, self.agent, ctx)])
+
+    async def test_cache_hit_is_recorded_in_context_memory(self):
+        ctx = Context(self.agent)
+        self.assertEqual(await self._ask(ctx, "Generate HR dashboard"), "Total Employees: 3")
+        self.assertEqual(await self._ask(ctx, "Show the HR dashboard"), "Total Employees: 3")
+
+        messages = await (await ctx.store.get("memory")).aget()
+        few_shot = len(hr_client.FEW_SHOT_MESSAGES)
+        self.assertEqual([m.content for m in messages[:few_shot]],
+                         [m.content for m in hr_client.FEW_SHOT_MESSAGES])
+        self.assertEqual([m.role.value for m in messages[few_shot:]], ["user", "assistant", "user", "assistant"])
+        self.assertTrue(messages[few_shot].content.endswith("Generate HR dashboard"))
+        self.assertEqual(messages[few_shot + 1].content, "Total Employees: 3")
+        self.assertTrue(messages[few_shot + 2].content.endswith("Show the HR dashboard"))
+        self.assertIn(ctx, hr_client._PRIMED_CONTEXTS)
+
+
+def _mcp_result(tool_name, value, structured=True):
+    """ToolCallResult as the agent reports an MCP tool call that returned value"""
+    items = value if isinstance(value, list) else [value]
+    raw = CallToolResult(
+        content=[TextContent(type='text', text=json.dumps(item, indent=2)) for item in items],
+        structuredContent={'result': value} if structured else None,
+    )
+    output = ToolOutput(content=str(raw), tool_name=tool_name, raw_input={}, raw_output=raw)
+    return ToolCallResult(tool_name=tool_name, tool_kwargs={}, tool_id='call-1', tool_output=output,
+                          return_direct=False)
+
+
+class PrintToolResultTest(unittest.TestCase):
+    BALANCES = {
+        'employee': 'John Doe', 'year': 2026,
+        'balances': [{'leave_type': 'Annual Leave', 'entitled_days': 21, 'used_days': 2, 'remaining_days': 19}],
+    }
+    EMPLOYEES = [
+        {'employee_id': 'EMP00001', 'first_name': 'John', 'last_name': 'Doe', 'email': 'john@company.com'},
+        {'employee_id': 'EMP00002', 'first_name': 'Sarah', 'last_name': 'Johnson', 'email': 'sarah@company.com'},
+    ]
+
+    def _printed(self, event):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            hr_client._print_tool_result(event)
+        return out.getvalue()
+
+    def test_balances_dict_is_formatted(self):
+        for structured in (True, False):
+            printed = self._printed(_mcp_result('get_leave_balance', self.BALANCES, structured))
+            self.assertIn('Leave Balance for John Doe (2026)', printed)
+            self.assertIn('- Remaining: 19 days', printed)
+
+    def test_employee_list_is_formatted(self):
+        for structured in (True, False):
+            printed = self._printed(_mcp_result('search_employees', self.EMPLOYEES, structured))
+            self.assertIn('Found 2 employees:', printed)
+            self.assertIn('**Sarah Johnson** (EMP00002)', printed)
+
+    def test_failed_result_shows_error(self):
+        printed = self._printed(_mcp_result('add_employee', {'success': False, 'error': 'Missing required field: email'}))
+        self.assertIn('❌ Tool failed: Missing required field: email', printed)
+        self.assertIn('Employee was NOT added', printed)
+
+    def test_tool_error_uses_is_error(self):
+        output = ToolOutput(content='Error: boom', tool_name='search_employees', raw_input={}, raw_output=None,
+                            is_error=True)
+        event = ToolCallResult(tool_name='search_employees', tool_kwargs={}, tool_id='call-1', tool_output=output,
+                               return_direct=False)
+        self.assertEqual(self._printed(event), '❌ Tool failed: Error: boom\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
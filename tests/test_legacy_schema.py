@@ -0,0 +1,93 @@
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# employees as created before employment_status became an integer code
+BASELINE_EMPLOYEES_SQL = '''
+    CREATE TABLE employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id TEXT UNIQUE NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        phone TEXT,
+        date_of_birth DATE,
+        gender TEXT,
+        marital_status TEXT,
+        address TEXT,
+        city TEXT,
+        state TEXT,
+        country TEXT,
+        postal_code TEXT,
+        department_id INTEGER REFERENCES departments(id),
+        position_id INTEGER REFERENCES positions(id),
+        manager_id INTEGER REFERENCES employees(id),
+        hire_date DATE NOT NULL,
+        employment_status TEXT DEFAULT 'active',
+        employment_type TEXT DEFAULT 'full-time',
+        work_location TEXT DEFAULT 'office',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+class LegacySchemaTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        conn = sqlite3.connect('hr_management.db')
+        conn.execute(BASELINE_EMPLOYEES_SQL)
+        conn.executemany(
+            "INSERT INTO employees (employee_id, first_name, last_name, email, hire_date, employment_status) "
+            "VALUES (?, ?, ?, ?, '2024-01-01', ?)",
+            [('EMP00001', 'Ada', 'Active', 'ada@company.com', 'active'),
+             ('EMP00002', 'Tom', 'Terminated', 'tom@company.com', 'terminated')],
+        )
+        conn.commit()
+        conn.close()
+
+        # The server initializes hr_management.db in the working directory on import
+        sys.path.insert(0, ROOT)
+        sys.modules.pop('hr_server', None)
+        self.hr = importlib.import_module('hr_server')
+
+    def tearDown(self):
+        self.hr.configure_pool(0)
+        sys.modules.pop('hr_server', None)
+        sys.path.remove(ROOT)
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_employee_added_after_migration_is_active(self):
+        result = self.hr.add_employee('New', 'Hire', 'new.hire@company.com', 'Engineering', 'Engineer', 90000)
+        self.assertTrue(result['success'], result)
+
+        active = {emp['employee_id'] for emp in self.hr.list_all_employees()}
+        self.assertEqual(active, {'EMP00001', result['employee_id']})
+
+        stats = self.hr.generate_hr_dashboard()['employee_statistics']
+        self.assertEqual((stats['total'], stats['active'], stats['terminated']), (3, 2, 1))
+
+    def test_employment_status_column_is_rebuilt_as_integer(self):
+        conn = sqlite3.connect('hr_management.db')
+        column_type = conn.execute(
+            "SELECT type FROM pragma_table_info('employees') WHERE name = 'employment_status'"
+        ).fetchone()[0]
+        statuses = conn.execute(
+            "SELECT employee_id, employment_status, typeof(employment_status) FROM employees ORDER BY id"
+        ).fetchall()
+        conn.close()
+
+        self.assertEqual(column_type, 'INTEGER')
+        self.assertEqual(statuses, [('EMP00001', 1, 'integer'), ('EMP00002', 2, 'integer')])
+
+
+if __name__ == '__main__':
+    unittest.main()